@@ -8,6 +8,21 @@ import wave
 import glob
 import time
 import platform
+import multiprocessing
+import multiprocessing.pool
+import hashlib
+import cPickle
+import threading
+import traceback
+import struct
+import tempfile
+import StringIO
+import mmap
+import collections
+import select
+import ctypes
+import ctypes.util
+import json
 from os.path import isdir, isfile, join, basename, dirname
 import numpy as np
 
@@ -50,6 +65,14 @@ colourDict = {'IY':(238,155,50),
 			  'IW':(140,34,27), 
 			  'ER':(127,242,5)}
 
+## when more vowels than this are visible the plot draws a density raster instead of individual vowel bitmaps
+DENSITY_THRESHOLD = 20000
+DENSITY_BIN = 3 ## size in pixels of each cell in the density raster
+
+## parsed info files are cached here so unchanged files don't need to be parsed again (see LoadParsedInfoFile)
+PARSE_CACHE_DIR = 'parse_cache'
+PARSE_CACHE_VERSION = 2 ## change when ParseInfoFile's output changes so old cache files are ignored
+
 def UpdateFAVE(filePath, outPath):
 	## converts layout of formant.txt files output from FAVE-extract
 	## so they can be read by FVR
@@ -101,47 +124,1701 @@ def UpdateFAVE(filePath, outPath):
 				out.write(l)
 
 
-class VowelButton():
+def OptionalArgHandler(lineList, index, returnType = str):
+	## allows some vowels to have empty info for certain settings
+	try: return returnType(lineList[index])
+	except: return None
+
+def GetHeadingLocations(headingList, configDict, delimiter):
+	## creates dictionary of headings:column in info file 
+	## used to find vowel values 
+	locationDict = {}
+	for i,head in enumerate(headingList.split(delimiter)):
+		head = head.strip()
+		if head in configDict and head:
+			cat = configDict[head]
+			if isinstance(cat, tuple):
+				i = (i, cat[1])
+				cat = cat[0]
+			try: locationDict[cat] += [i]
+			except: locationDict[cat] = [i]
+	locationDict = {k : v[0] if len(v)==1 else v for k,v in locationDict.iteritems()}
+	return locationDict
+
+def DecodeAlternates(row, locations, altType):
+	## gets the alternate f1 and f2 values
+	## returns (alternate setting, (f1,f2)) ex. an alternate setting might be 20 for formants measured
+	## at 20% of the vowel duration...
+	alternates = []
+	for l in locations:
+		alt = OptionalArgHandler(row,l[0])
+		if re.sub('[ ,]','',alt):
+			alternates.append((alt, l[1]))
+	alts = [(int(i[1])/100.0 if altType == 'd' else int(i[1]), tuple(int(float(j)) for j in i[0].split(',')) ) for i in alternates]
+	return alts
+
+def ParseInfoFile(task):
+	## reads the vowels from one info file (runs in a worker process, see ParseInfoFiles)
+	## task = (info file path, config settings {heading : category}, column delimiter, heading row number)
+	## returns {'columns' : {column : array of values (alternate columns are the arrays made by FlattenAlternates)}, 'labels' : {column : labels in order of their code},
+	##			'errors' : rows that could not be parsed, 'headings' : {category : column index} (None if no heading row),
+	##			'lineIndex' : (ParseCacheKey of the file, byte offset of each line and of the end of the file)}
+	## cmu, other, word and pronunciation labels are coded per file (-1 == no label), see PlotPanel.MergeParsedColumns
+	infoFile, configDict, delimiter, headingRow = task
+	labels = {name : LabelCodes() for name in ['cmu', 'other', 'word', 'pronunciation']}
+	## values for each vowel in the file are collected column by column
+	columns = {name : [] for name in ['f1', 'f2', 'start', 'end', 'timePoint', 'maxFormant', 'stress', 'cmu', 'other', 'word', 
+									  'pronunciation', 'index', 'pitch', 'line', 'durationAlternates', 'maxFormantAlternates']}
+	errors = []
+	headingCol = None
+	fileKey = ParseCacheKey(infoFile)
+	lineOffsets = [] # byte offset of the start of each line (used when saving, see SaveButton.SaveFiles)
+	offset = 0
+	with open(infoFile, 'rb') as info: #read file
+		for n,i in enumerate(info): # iterate through lines
+			lineOffsets.append(offset)
+			offset += len(i)
+			if n < headingRow: # do nothing for lines above heading row
+				continue
+			elif n == headingRow: 
+				headingCol = GetHeadingLocations(i, configDict, delimiter) # get column index for each heading
+			else: # get vowel info
+				try:
+					if i.strip(): # makes sure line isn't empty
+						i = i.strip().split(delimiter) ## split the row into a list
+						## read the vowel values in the row 
+						## (note some settings are optional)
+						f1 = int(float(i[headingCol['F1']]))
+						f2 = int(float(i[headingCol['F2']]))
+						word = i[headingCol['WORD']]
+						cmu = i[headingCol['CMU']][:2]
+						colourDict[cmu] ## raises a KeyError if there is no bitmap for this cmu label
+						other = OptionalArgHandler(i,headingCol['OTHER']) if 'OTHER' in headingCol else None
+						start, stop = float(i[headingCol['START']]) , float(i[headingCol['END']]) 
+						stress = int(i[headingCol['STRESS']])
+						timePoint = float(i[headingCol['TIME']])
+						pronunciation = re.sub("[\[\]\'\ ]", '', i[headingCol['PRONUNCIATION']]).split(',') if 'PITCH' in headingCol else None
+						maxFormant = int(i[headingCol['MAXFORMANT']])
+						index = int(i[headingCol['INDEX']]) if 'INDEX' in headingCol else None
+						durationAlternates = DecodeAlternates(i, headingCol['DURATION_ALTERNATES'], 'd') if 'DURATION_ALTERNATES' in headingCol else []
+						maxFormantAlternates = DecodeAlternates(i, headingCol['MAXFORMANT_ALTERNATES'], 'm') if 'MAXFORMANT_ALTERNATES' in headingCol else []
+						pitch = OptionalArgHandler(i,headingCol['PITCH'], int) if 'PITCH' in headingCol else None
+						## add the values to the appropriate columns
+						for name, value in [('f1', f1), ('f2', f2), ('start', start), ('end', stop), ('timePoint', timePoint), 
+											('maxFormant', maxFormant), ('stress', stress), ('line', n),
+											('cmu', labels['cmu'].Encode(cmu)),
+											('other', labels['other'].Encode(other.decode('utf8')) if other else -1),
+											('word', labels['word'].Encode(word)),
+											('pronunciation', labels['pronunciation'].Encode(tuple(pronunciation)) if pronunciation else -1),
+											('index', index if index is not None else -1),
+											('pitch', pitch if pitch is not None else -1),
+											('durationAlternates', durationAlternates),
+											('maxFormantAlternates', maxFormantAlternates)]:
+							columns[name].append(value)
+				except:
+					errors.append(n)
+	for name, (dtype, fill) in VowelStore.columns.items():
+		if name in columns:
+			columns[name] = np.array(columns[name], dtype = dtype)
+	for name in VowelStore.alternateColumns:
+		columns[name] = FlattenAlternates(columns[name])
+	lineOffsets.append(offset)
+	return {'columns' : columns, 'labels' : {name : codes.labels for name, codes in labels.items()}, 'errors' : errors, 'headings' : headingCol,
+			'lineIndex' : (fileKey, np.array(lineOffsets, dtype = np.int64))}
+
+def ParseCachePath(task, key = None):
+	## returns the path of the parse cache file for an info file read with the settings in task (see ParseInfoFile)
+	## the file's size and modification time (key, see ParseCacheKey) are part of the name so checking whether 
+	## a file is cached doesn't need to read the cache
+	infoFile, configDict, delimiter, headingRow = task
+	settings = repr((PARSE_CACHE_VERSION, os.path.abspath(infoFile), sorted(configDict.items()), delimiter, headingRow))
+	if key is None:
+		key = ParseCacheKey(infoFile)
+	return join(PARSE_CACHE_DIR, hashlib.sha1(settings).hexdigest()+'-'+hashlib.sha1(key).hexdigest()+'.npz')
+
+def ParseCacheKey(infoFile):
+	## the cache is only used if the info file still has the size and modification time it had when it was parsed
+	stat = os.stat(infoFile)
+	return repr((stat.st_size, stat.st_mtime))
+
+def LoadParsedInfoFile(task):
+	## returns the result of ParseInfoFile(task) from the parse cache (None if it isn't cached or the file has changed)
+	try:
+		with open(ParseCachePath(task), 'rb') as cacheFile:
+			cache = np.load(cacheFile)
+			objects = cPickle.loads(cache['objects'].tostring())
+			if objects['key'] != ParseCacheKey(task[0]):
+				return None
+			parsed = objects['parsed']
+			parsed['lineIndex'] = (objects['key'], cache['lineOffsets'])
+			parsed['columns'] = {name : cache[name] for name in VowelStore.columns if name in cache.files}
+			for name in VowelStore.alternateColumns:
+				parsed['columns'][name] = tuple(cache[name+part] for part in ['_counts', '_settings', '_f1', '_f2'])
+			return parsed
+	except:
+		return None
+
+def SaveParsedInfoFile(task, parsed):
+	## writes the result of ParseInfoFile(task) to the parse cache 
+	## columns and line offsets are stored as arrays and everything else (labels, errors, headings) is pickled
+	path = ParseCachePath(task, parsed['lineIndex'][0])
+	arrays = {name : values for name, values in parsed['columns'].items() if name in VowelStore.columns}
+	for name in VowelStore.alternateColumns:
+		arrays.update(zip([name+part for part in ['_counts', '_settings', '_f1', '_f2']], parsed['columns'][name]))
+	arrays['lineOffsets'] = parsed['lineIndex'][1]
+	objects = {'key' : parsed['lineIndex'][0], 'parsed' : dict(parsed, columns = {}, lineIndex = None)}
+	arrays['objects'] = np.frombuffer(cPickle.dumps(objects, cPickle.HIGHEST_PROTOCOL), np.uint8)
+	if not isdir(PARSE_CACHE_DIR):
+		os.makedirs(PARSE_CACHE_DIR)
+	## write to a temporary file first so a half written cache file is never read
+	with open(path+'.tmp', 'wb') as cacheFile:
+		np.savez(cacheFile, **arrays)
+	if isfile(path): os.remove(path)
+	os.rename(path+'.tmp', path)
+	## cache files for older versions of the info file are no longer needed
+	for oldPath in glob.glob(path[:path.rindex('-')]+'-*.npz'):
+		if oldPath != path:
+			try: os.remove(oldPath)
+			except OSError: pass
+
+def ParseAndCacheInfoFile(task):
+	## parses an info file and saves the result to the parse cache (failing to save doesn't stop the file from loading)
+	parsed = ParseInfoFile(task)
+	try:
+		SaveParsedInfoFile(task, parsed)
+	except:
+		print >> sys.stderr, 'unable to write parse cache for '+task[0]
+	return parsed
+
+def IsParseCached(task):
+	## returns True if there is a parse cache file for the info file as it is now (see ParseCachePath)
+	try:
+		return isfile(ParseCachePath(task))
+	except OSError:
+		return False
+
+def ParseInfoFiles(tasks, cancelled = None):
+	## parses each info file in tasks (see ParseInfoFile) in a separate process
+	## files that haven't changed since they were last parsed are read from the parse cache instead (one at a time as they are needed)
+	## yields the results in the same order as tasks (as soon as each one is ready)
+	## stops early if the cancelled event is set (see ParseUncachedInfoFiles)
+	cached = [IsParseCached(task) for task in tasks]
+	parsed = ParseUncachedInfoFiles([task for task, c in zip(tasks, cached) if not c], cancelled)
+	try:
+		for task, c in zip(tasks, cached):
+			result = LoadParsedInfoFile(task) if c else next(parsed)
+			if result is None: ## the cache file couldn't be read after all
+				result = ParseAndCacheInfoFile(task)
+			yield result
+	finally:
+		parsed.close()
+
+SAVE_BLOCK_SIZE = 1 << 20 # bytes copied at a time when saving info files
+SAVE_THREADS = 8 # maximum number of info files saved at the same time
+
+def LineOffsets(path):
+	## returns the byte offset of the start of each line in a file and of the end of the file
+	offsets = [np.zeros(1, dtype = np.int64)]
+	size = 0
+	with open(path, 'rb') as f:
+		for block in iter(lambda: f.read(16*SAVE_BLOCK_SIZE), ''):
+			offsets.append(np.flatnonzero(np.frombuffer(block, np.uint8) == ord('\n')) + (size+1))
+			size += len(block)
+	offsets = np.concatenate(offsets)
+	if offsets[-1] != size: ## last line doesn't end with a new line
+		offsets = np.append(offsets, size)
+	return offsets
+
+def ChangeInfoLine(line, change, columnIndexes, delimiter):
+	## returns a line of an info file with the values in change (a row of PlotPanel.changes, see VowelButton.LogChange)
+	## columnIndexes are the TIME, MAXFORMANT, F1 and F2 columns of the file
+	## the line keeps its own line ending ('\n' or '\r\n') so the lines that are copied as they are match it
+	content = line.rstrip('\r\n')
+	ending = line[len(content):] or '\n'
+	line = content.split(delimiter)
+	for i, columnIndex in enumerate(columnIndexes):
+		line[columnIndex] = change[i+1]
+	return str(delimiter).join(line+change[5:])+ending
+
+def CopyBytes(source, destination, n):
+	## copies n bytes from the current position of file source to file destination
+	while n > 0:
+		block = source.read(min(n, SAVE_BLOCK_SIZE))
+		if not block: break
+		destination.write(block)
+		n -= len(block)
+
+def PatchFile(source, offsets, newLines, destination):
+	## writes file source to file destination with some lines replaced
+	## offsets are the byte offsets of the lines in source (see LineOffsets) and newLines is {line number : new line}
+	## the unchanged lines between the new ones are copied as they are
+	position = 0
+	for n in sorted(newLines):
+		source.seek(position)
+		CopyBytes(source, destination, offsets[n]-position)
+		destination.write(newLines[n])
+		position = offsets[n+1]
+	source.seek(position)
+	CopyBytes(source, destination, offsets[-1]-position)
+
+MOVEFILE_REPLACE_EXISTING = 0x1
+MOVEFILE_WRITE_THROUGH = 0x8
+
+def ReplaceFile(source, destination):
+	## renames file source to destination, replacing destination in one go
+	## (os.rename doesn't replace files on windows so MoveFileEx is used instead)
+	if platform.system() == 'Windows':
+		if not ctypes.windll.kernel32.MoveFileExW(unicode(source), unicode(destination), MOVEFILE_REPLACE_EXISTING|MOVEFILE_WRITE_THROUGH):
+			raise ctypes.WinError()
+	else:
+		os.rename(source, destination)
+
+def SaveInfoFile(task):
+	## writes an info file with its changes (see SaveButton.SaveFiles)
+	## task = (info file, changes (at most one per line), output file, line offsets of the info file, TIME/MAXFORMANT/F1/F2 columns, delimiter)
+	## the output is written to a temporary file in the same directory which then replaces the output file in one go
+	## (so a failed save never leaves a half written file)
+	## returns the line offsets of the new file
+	infoFile, changes, logFile, offsets, columnIndexes, delimiter = task
+	newLines = {} ## {line number : line with changes}
+	with open(infoFile, 'rb') as infoF: ## read the changed lines from the old (input) file
+		for c in changes: ## make changes to the line read from the old file according to the changes
+			infoF.seek(offsets[c[0]])
+			newLines[c[0]] = ChangeInfoLine(infoF.read(offsets[c[0]+1]-offsets[c[0]]), c, columnIndexes, delimiter)
+		handle, tempPath = tempfile.mkstemp(prefix = basename(logFile)+'.', suffix = '.tmp', dir = dirname(os.path.abspath(logFile)))
+		try:
+			with os.fdopen(handle, 'wb') as logF: ## write new lines (with changes) and copy the rest
+				PatchFile(infoF, offsets, newLines, logF)
+				logF.flush()
+				os.fsync(logF.fileno())
+			os.chmod(tempPath, os.stat(logFile if isfile(logFile) else infoFile).st_mode & 0777)
+		except:
+			os.remove(tempPath)
+			raise
+	try:
+		ReplaceFile(tempPath, logFile)
+	except:
+		os.remove(tempPath)
+		raise
+	## the lines after the changed ones have moved
+	lengths = np.diff(offsets)
+	for n, line in newLines.items():
+		lengths[n] = len(line)
+	return np.concatenate([[0], np.cumsum(lengths)])
+
+def SaveInfoFiles(tasks):
+	## saves each info file in tasks (see SaveInfoFile) on a separate thread
+	## returns the result of each task in order (the exception raised if saving the file failed)
+	def Save(task):
+		try: return SaveInfoFile(task)
+		except Exception as error: return error
+	if len(tasks) < 2:
+		return [Save(task) for task in tasks]
+	pool = multiprocessing.pool.ThreadPool(min(len(tasks), SAVE_THREADS))
+	try:
+		return pool.map(Save, tasks)
+	finally:
+		pool.close()
+
+CHANGE_JOURNAL = 'change_journal.txt' # every change to a vowel is recorded here as soon as it is made (see ChangeJournal)
+JOURNAL_SYNC_INTERVAL = 1.0 # seconds between forcing the journal to disk
+
+class ChangeJournal():
+	## append-only record of the changes made to vowels (the rows of PlotPanel.changes, see VowelButton.LogChange)
+	## so that changes that haven't been saved to the info files yet can be recovered after a crash
+	## each line is a json list: ["change", info file, change] or ["done", info file] once an info file's changes
+	## have been saved (or discarded)
+	## writes are flushed straight away but only forced to disk every JOURNAL_SYNC_INTERVAL seconds
+	def __init__(self, path = CHANGE_JOURNAL):
+		self.path = path
+		self.journal = None # opened when the first change is recorded
+		self.lock = threading.Lock()
+		self.syncTimer = None
+
+	def Append(self, infoFile, change):
+		## records a change to a vowel in infoFile
+		self.Write(['change', infoFile, change])
+
+	def AppendAll(self, changes):
+		## records several changes at once (changes = [(info file, change), ...])
+		self.Write(*[['change', infoFile, change] for infoFile, change in changes])
+
+	def MarkDone(self, infoFile):
+		## records that the changes to infoFile have been saved (or discarded)
+		self.Write(['done', infoFile])
+
+	def Write(self, *entries):
+		with self.lock:
+			try:
+				if self.journal is None:
+					self.journal = open(self.path, 'a')
+				self.journal.write(''.join(json.dumps(entry)+'\n' for entry in entries))
+				self.journal.flush()
+			except IOError:
+				print >> sys.stderr, 'unable to write to the change journal '+self.path
+				return
+			if self.syncTimer is None:
+				self.syncTimer = threading.Timer(JOURNAL_SYNC_INTERVAL, self.Sync)
+				self.syncTimer.daemon = True
+				self.syncTimer.start()
+
+	def Sync(self):
+		## forces everything written so far to disk
+		with self.lock:
+			self.syncTimer = None
+			if self.journal is not None:
+				try: os.fsync(self.journal.fileno())
+				except (IOError, OSError): pass
+
+	def Pending(self):
+		## returns {info file : [change, ...]} of the changes in the journal that haven't been saved
+		## (only the latest change to each line)
+		pending = collections.OrderedDict()
+		try:
+			with open(self.path) as journal:
+				for line in journal:
+					try:
+						entry = json.loads(line)
+					except ValueError:
+						continue ## last line was only partly written
+					if entry[0] == 'change':
+						change = entry[2]
+						change[1:] = [v.encode('utf8') for v in change[1:]] ## json reads strings as unicode
+						pending.setdefault(entry[1], collections.OrderedDict())[change[0]] = change
+					elif entry[0] == 'done':
+						pending.pop(entry[1], None)
+		except IOError:
+			pass
+		return collections.OrderedDict((infoFile, changes.values()) for infoFile, changes in pending.items())
+
+	def Compact(self):
+		## rewrites the journal with only the changes that haven't been saved
+		pending = self.Pending()
+		with self.lock:
+			if self.syncTimer is not None:
+				self.syncTimer.cancel()
+				self.syncTimer = None
+			if self.journal is not None:
+				self.journal.close()
+				self.journal = None
+			try:
+				if not pending:
+					if isfile(self.path): os.remove(self.path)
+					return
+				with open(self.path+'.tmp', 'w') as journal:
+					for infoFile, changes in pending.items():
+						for change in changes:
+							journal.write(json.dumps(['change', infoFile, change])+'\n')
+					journal.flush()
+					os.fsync(journal.fileno())
+				if isfile(self.path): os.remove(self.path)
+				os.rename(self.path+'.tmp', self.path)
+			except (IOError, OSError):
+				print >> sys.stderr, 'unable to compact the change journal '+self.path
+
+changeJournal = ChangeJournal()
+
+PARSE_CANCEL_POLL = 0.1 # seconds between checks for cancelled loading while a file is being parsed
+
+def ParseUncachedInfoFiles(tasks, cancelled = None):
+	## parses each info file in tasks in a separate process (yields the results in order)
+	## if the cancelled event is set the parsing processes are stopped without waiting for the current file
+	## (so a single file is only parsed in this process when loading can't be cancelled)
+	if not tasks: return
+	if len(tasks) < 2 and cancelled is None:
+		for task in tasks:
+			yield ParseAndCacheInfoFile(task)
+		return
+	try:
+		pool = multiprocessing.Pool(min(len(tasks), multiprocessing.cpu_count()))
+	except:
+		## fall back to parsing the files one by one if worker processes can't be started
+		for task in tasks:
+			yield ParseAndCacheInfoFile(task)
+		return
+	try:
+		results = pool.imap(ParseAndCacheInfoFile, tasks)
+		for i in range(len(tasks)):
+			while True:
+				try:
+					parsed = results.next(PARSE_CANCEL_POLL)
+					break
+				except multiprocessing.TimeoutError:
+					if cancelled is not None and cancelled.is_set(): return
+			yield parsed
+	finally:
+		pool.terminate()
+
+## wav files are memory mapped and clips are cached here (see AudioCache)
+CLIP_CACHE_BYTES = 64*1024*1024 # maximum total size of the cached clips
+MAX_MAPPED_WAVS = 64 # maximum number of wav files kept memory mapped
+
+def ReadWavHeader(wav):
+	## reads the header of a wav file (wav is an open file or mmap positioned at the start of the file)
+	## returns (number of channels, sample width in bytes, frame rate, number of frames, position of the first frame in the file)
+	riff, size, riffType = struct.unpack('<4sI4s', wav.read(12))
+	if riff != 'RIFF' or riffType != 'WAVE':
+		raise wave.Error('not a wav file')
+	fmt = None
+	while True:
+		head = wav.read(8)
+		if len(head) < 8:
+			raise wave.Error('no data chunk in wav file')
+		name, size = struct.unpack('<4sI', head)
+		if name == 'fmt ':
+			fmt = struct.unpack('<HHIIHH', wav.read(16))
+			wav.seek(size - 16 + size%2, 1)
+		elif name == 'data' and fmt:
+			nChannels, frameRate, sampWidth = fmt[1], fmt[2], (fmt[5]+7)//8
+			return (nChannels, sampWidth, frameRate, size // (nChannels*sampWidth), wav.tell())
+		else:
+			wav.seek(size + size%2, 1) ## chunks are padded to an even number of bytes
+
+def PlayWavData(data):
+	## plays the bytes of a wav file without writing them to disk and returns the wx.Sound
+	## (keep a reference to it until it is done playing)
+	try:
+		sound = wx.SoundFromData(data)
+	except:
+		## some platforms can't play sounds from memory so write the sound to its own temporary file instead
+		handle, path = tempfile.mkstemp(suffix = '.wav')
+		with os.fdopen(handle, 'wb') as tempWav:
+			tempWav.write(data)
+		sound = wx.Sound(path)
+		sound.Play()
+		try: os.remove(path)
+		except: pass
+		return sound
+	sound.Play()
+	return sound
+
+class AudioCache():
+	## shared access to the audio in wav files (used for playing vowels)
+	## each wav file is memory mapped once and segments are read as views into the map (no copying or seeking)
+	## clips made for playing are kept in a least recently used cache so replaying a vowel doesn't touch the file
+	def __init__(self, maxClipBytes = CLIP_CACHE_BYTES, maxWavs = MAX_MAPPED_WAVS):
+		self.maxClipBytes = maxClipBytes
+		self.maxWavs = maxWavs
+		self.wavs = collections.OrderedDict() # {wav file : ((size, modification time), header, mmap)} in order of use
+		self.clips = collections.OrderedDict() # {(wav file, start, end) : bytes of a wav file} in order of use
+		self.clipBytes = 0 # total size of the cached clips
+		self.lock = threading.RLock() # the cache can be used from more than one thread
+
+	def GetWav(self, path):
+		## returns (header, mmap) of a wav file (see ReadWavHeader)
+		## the file is mapped again if it has changed since it was mapped
+		stat = os.stat(path)
+		key = (stat.st_size, stat.st_mtime)
+		with self.lock:
+			if path in self.wavs:
+				if self.wavs[path][0] == key:
+					self.wavs[path] = self.wavs.pop(path) ## move to the end (most recently used)
+					return self.wavs[path][1:]
+				self.Forget(path)
+			with open(path, 'rb') as wavFile:
+				wavMap = mmap.mmap(wavFile.fileno(), 0, access = mmap.ACCESS_READ)
+			header = ReadWavHeader(wavMap)
+			self.wavs[path] = (key, header, wavMap)
+			while len(self.wavs) > self.maxWavs:
+				self.Forget(next(iter(self.wavs)))
+			return header, wavMap
+
+	def Forget(self, path):
+		## removes a wav file and its clips from the cache
+		## (the map isn't closed explicitly so views returned by GetFrames stay valid, it is closed once they are gone)
+		with self.lock:
+			del self.wavs[path]
+			for clipKey in [k for k in self.clips if k[0] == path]:
+				self.clipBytes -= len(self.clips.pop(clipKey))
+
+	def GetFrames(self, path, start, end):
+		## returns (header, frames) for the part of a wav file from start to end (in seconds)
+		## frames is a uint8 array that is a view into the mapped file (it is not copied)
+		header, wavMap = self.GetWav(path)
+		nChannels, sampWidth, frameRate, nFrames, dataStart = header
+		frameSize = nChannels*sampWidth
+		startFrame = min(max(int(start*frameRate), 0), nFrames)
+		endFrame = min(max(int(end*frameRate), startFrame), nFrames)
+		return header, np.frombuffer(wavMap, np.uint8, (endFrame-startFrame)*frameSize, dataStart + startFrame*frameSize)
+
+	def GetSamples(self, path, start, end):
+		## returns (frame rate, samples) for the part of a wav file from start to end (in seconds)
+		## samples is an array with a column for each channel (a view into the mapped file for 1, 2 and 4 byte samples)
+		header, frames = self.GetFrames(path, start, end)
+		nChannels, sampWidth, frameRate = header[:3]
+		if sampWidth == 3:
+			## 24 bit samples are widened to 32 bits
+			frames = frames.reshape(-1, 3)
+			samples = (frames[:,0].astype(np.int32) << 8 | frames[:,1].astype(np.int32) << 16 | frames[:,2].astype(np.int32) << 24) >> 8
+		else:
+			samples = frames.view({1 : np.uint8, 2 : '<i2', 4 : '<i4'}[sampWidth])
+		return frameRate, samples.reshape(-1, nChannels)
+
+	def GetClip(self, path, start, end):
+		## returns the part of a wav file from start to end (in seconds) as the bytes of a complete wav file
+		key = (path, start, end)
+		with self.lock:
+			self.GetWav(path) ## forgets the cached clips if the file has changed
+			if key in self.clips:
+				self.clips[key] = self.clips.pop(key) ## move to the end (most recently used)
+				return self.clips[key]
+			header, frames = self.GetFrames(path, start, end)
+			nChannels, sampWidth, frameRate = header[:3]
+			clip = StringIO.StringIO()
+			clipWav = wave.open(clip, 'wb')
+			clipWav.setnchannels(nChannels)
+			clipWav.setsampwidth(sampWidth)
+			clipWav.setframerate(frameRate)
+			clipWav.writeframes(frames.tostring())
+			clipWav.close()
+			self.clips[key] = clip.getvalue()
+			self.clipBytes += len(self.clips[key])
+			## drop the least recently used clips until the cache fits in its budget
+			while self.clipBytes > self.maxClipBytes and len(self.clips) > 1:
+				self.clipBytes -= len(self.clips.popitem(last = False)[1])
+			return self.clips[key]
+
+audioCache = AudioCache()
+
+## vowels within this many pixels of the mouse have their clips loaded in the background when playing (see ClipPrefetcher)
+PREFETCH_RADIUS = 40
+PREFETCH_MAX_VOWELS = 50 # maximum number of vowels near the mouse to prefetch at once
+PREFETCH_BYTES = CLIP_CACHE_BYTES/4 # maximum size of the clips loaded for one prefetch request
+
+class ClipPrefetcher():
+	## loads the clips of vowels that are likely to be played next into an AudioCache on a background thread
+	## each request replaces the last one (so the clips being loaded always match what is on screen) 
+	## and stops once its clips take up more than the memory budget
+	def __init__(self, cache, budget = PREFETCH_BYTES):
+		self.cache = cache
+		self.budget = budget
+		self.pending = [] # (wav, start, end) of the clips still to be loaded, most likely to be played first
+		self.loadedBytes = 0 # size of the clips loaded for the current request
+		self.condition = threading.Condition()
+		self.thread = None # started when the first request is made
+
+	def Prefetch(self, clips):
+		## replaces the current request with clips (a list of (wav, start, end))
+		with self.condition:
+			self.pending = list(clips)
+			self.loadedBytes = 0
+			self.condition.notify()
+		if self.thread is None:
+			self.thread = threading.Thread(target = self.Run)
+			self.thread.daemon = True
+			self.thread.start()
+
+	def Cancel(self):
+		## stops loading the clips of the current request
+		with self.condition:
+			self.pending = []
+
+	def Run(self):
+		while True:
+			with self.condition:
+				while not self.pending:
+					self.condition.wait()
+				if self.loadedBytes > self.budget:
+					self.pending = []
+					continue
+				clip = self.pending.pop(0)
+			try:
+				size = len(self.cache.GetClip(*clip))
+			except:
+				continue ## unreadable files are reported when the vowel is actually played
+			with self.condition:
+				self.loadedBytes += size
+
+clipPrefetcher = ClipPrefetcher(audioCache)
+
+## settings used to estimate formants without Praat (see EstimateFormants), these match the settings in zoomIn.praat
+FORMANT_CEILING = 5500 # highest formant frequency looked for (Hz)
+FORMANT_WINDOW = 0.025 # analysis window length (s), the gaussian window used is twice this long (as in Praat)
+PRE_EMPHASIS_FROM = 50 # frequency (Hz) above which the spectrum is boosted by 6 dB/octave
+FORMANT_SETTINGS = [3, 4, 5, 6] # numbers of formants that alternates are estimated for
+
+def Resample(samples, oldRate, newRate):
+	## resamples a signal by truncating (or zero padding) its spectrum
+	if oldRate == newRate or not len(samples): return samples
+	n = int(round(len(samples)*float(newRate)/oldRate))
+	spectrum = np.fft.rfft(samples)
+	return np.fft.irfft(spectrum[:n//2+1], n) * (float(n)/len(samples))
+
+def BurgLPC(frames, order):
+	## returns the linear prediction coefficients [1, a1, ..., a_order] of each row of frames (Burg's method)
+	a = np.zeros((len(frames), order+1))
+	a[:,0] = 1.0
+	forward = frames[:,1:].astype(float)
+	backward = frames[:,:-1].astype(float)
+	for m in range(order):
+		denominator = (forward*forward).sum(1) + (backward*backward).sum(1)
+		k = -2.0*(forward*backward).sum(1)/np.where(denominator > 0, denominator, 1)
+		a[:,:m+2] = a[:,:m+2] + k[:,None]*a[:,:m+2][:,::-1]
+		forward, backward = (forward + k[:,None]*backward)[:,1:], (backward + k[:,None]*forward)[:,:-1]
+	return a
+
+def AnalysisFrames(wav, times):
+	## returns (sample rate, frames) where each row of frames is the windowed signal around one of times (in seconds)
+	## (resampled so the formant ceiling is the nyquist frequency, pre-emphasised and gaussian windowed like Praat)
+	times = np.asarray(times, dtype = float)
+	frameRate, samples = audioCache.GetSamples(wav, times.min()-FORMANT_WINDOW, times.max()+FORMANT_WINDOW)
+	samples = samples.astype(float).mean(axis = 1)
+	## resample so the ceiling is the nyquist frequency
+	rate = min(2*FORMANT_CEILING, frameRate)
+	samples = Resample(samples - samples.mean(), frameRate, rate)
+	## pre-emphasis
+	alpha = np.exp(-2*np.pi*PRE_EMPHASIS_FROM/rate)
+	samples = np.append(samples[:1], samples[1:] - alpha*samples[:-1])
+	## cut a window around each time (padding with zeros at the edges of the file)
+	n = int(round(2*FORMANT_WINDOW*rate))
+	starts = np.round((times - times.min())*rate).astype(int)
+	samples = np.concatenate([samples, np.zeros(max(starts.max() + n - len(samples), 0))])
+	frames = samples[starts[:,None] + np.arange(n)]
+	## gaussian window
+	edge = np.exp(-12.0)
+	window = (np.exp(-48.0*((np.arange(n) - (n-1)/2.0)/(n+1))**2) - edge)/(1 - edge)
+	return rate, frames*window
+
+def FrameFormants(rate, frames, nFormants):
+	## returns (frequencies, bandwidths) of the formants found in each frame as arrays with a row for each frame
+	## formants are sorted by frequency, missing formants are nan 
+	## (formants are the angles of the roots of the prediction polynomial, found as eigenvalues of its companion matrix)
+	order = 2*nFormants
+	a = BurgLPC(frames, order)
+	companion = np.zeros((len(frames), order, order))
+	companion[:,0,:] = -a[:,1:]
+	companion[:,np.arange(1, order),np.arange(order-1)] = 1
+	roots = np.linalg.eigvals(companion)
+	frequencies = np.angle(roots)*rate/(2*np.pi)
+	bandwidths = -np.log(np.maximum(np.abs(roots), 1e-12))*rate/np.pi
+	keep = (np.imag(roots) > 0) & (frequencies > 50) & (frequencies < rate/2.0 - 50) & np.isfinite(frequencies)
+	frequencies = np.where(keep, frequencies, np.inf)
+	byFrequency = (np.arange(len(frames))[:,None], np.argsort(frequencies, axis = 1))
+	frequencies, bandwidths = frequencies[byFrequency], bandwidths[byFrequency]
+	missing = ~np.isfinite(frequencies)
+	frequencies[missing] = np.nan
+	bandwidths[missing] = np.nan
+	return frequencies, bandwidths
+
+def EstimateFormants(wav, timePoint, nFormants):
+	## estimates the formants of a wav file at timePoint (in seconds) looking for nFormants formants below FORMANT_CEILING Hz
+	## (pre-emphasis, gaussian window, Burg LPC and root solving like Praat's To Formant (burg)...)
+	## returns a list of (frequency, bandwidth) sorted by frequency
+	rate, frames = AnalysisFrames(wav, [timePoint])
+	frequencies, bandwidths = FrameFormants(rate, frames, nFormants)
+	found = np.isfinite(frequencies[0])
+	return zip(frequencies[0][found].tolist(), bandwidths[0][found].tolist())
+
+## formant tracks are measured every TRACK_STEP seconds over each vowel and saved in FORMANT_CACHE_DIR (see FormantTracks)
+TRACK_STEP = 0.005
+FORMANT_CACHE_DIR = 'formant_cache'
+TRACK_GROUP_FRAMES = 400 # maximum number of track frames analysed at once
+TRACK_BACKGROUND_FRAMES = 100 # track frames measured at a time in the background (the UI can measure in between)
+TRACK_BACKGROUND_PAUSE = 0.05 # seconds the background measuring waits between each TRACK_BACKGROUND_FRAMES
+DURATION_PERCENTAGES = [0.2, 0.35, 0.5, 0.65, 0.8] # duration alternates read from the tracks if the info file has none
+
+class FormantTracks():
+	## F1/F2 tracks over the vowels in each wav for every number of formants in FORMANT_SETTINGS
+	## tracks are measured when a remeasurement needs them (see EstimateFormants) and saved in the cache directory 
+	## (see TrackPath) so nothing is written next to the user's audio
+	## the rest of the vowels in the wav that is being remeasured can be measured in the background (one wav at a time)
+	## track files are memory mapped so alternates at any time or number of formants are looked up instead of measured
+	## a track file is an array of records sorted by time: the time (a multiple of TRACK_STEP) 
+	## and (f1, f2) for each number of formants in FORMANT_SETTINGS (0 == no formant found)
+	dtype = np.dtype([('time', '<f8'), ('formants', '<i2', (len(FORMANT_SETTINGS), 2))])
+
+	def __init__(self, directory = FORMANT_CACHE_DIR):
+		self.directory = directory
+		self.tracks = {} # {wav file : ((size, modification time) of the track file, memory mapped track)}
+		self.unsaved = {} # {wav file : track} for tracks that couldn't be saved in the cache directory
+		self.queue = None # (wav file, track steps) waiting to be measured in the background
+		self.lock = threading.RLock()
+		self.measuring = threading.Lock() # held while a track is measured and saved (so no frames are lost)
+		self.condition = threading.Condition()
+		self.thread = None # started when the first tracks are queued
+
+	def TrackPath(self, wav):
+		## returns the path of the track file of a wav file (named after the wav's absolute path)
+		return join(self.directory, hashlib.sha1(os.path.abspath(wav)).hexdigest()+'.npy')
+
+	def GetTrack(self, wav):
+		## returns the track of a wav file (None if it hasn't been measured or the wav has changed since)
+		with self.lock:
+			if wav in self.unsaved:
+				return self.unsaved[wav]
+			try:
+				stat = os.stat(self.TrackPath(wav))
+				if stat.st_mtime < os.stat(wav).st_mtime: return None
+			except OSError:
+				return None
+			key = (stat.st_size, stat.st_mtime)
+			if wav not in self.tracks or self.tracks[wav][0] != key:
+				track = np.load(self.TrackPath(wav), mmap_mode = 'r')
+				if track.dtype != self.dtype: return None ## made with different settings
+				self.tracks[wav] = (key, track)
+			return self.tracks[wav][1]
+
+	def FindFrame(self, wav, time):
+		## returns the wav's track and the index of its frame at time (in seconds) or (None, None) if it hasn't been measured
+		track = self.GetTrack(wav)
+		if track is None or not len(track): return None, None
+		time = round(time/TRACK_STEP)*TRACK_STEP
+		i = min(np.searchsorted(track['time'], time), len(track)-1)
+		if abs(track['time'][i] - time) > TRACK_STEP/2: return None, None
+		return track, i
+
+	def IsMeasured(self, wav, times):
+		## returns True if the wav's track has a frame at each of times (in seconds)
+		return all(self.FindFrame(wav, t)[0] is not None for t in times)
+
+	def Lookup(self, wav, time, nFormants):
+		## returns (f1, f2) of a wav file at time (in seconds) measured with nFormants formants (None if not measured)
+		if nFormants not in FORMANT_SETTINGS: return None
+		track, i = self.FindFrame(wav, time)
+		if track is None: return None
+		f1, f2 = track['formants'][i][FORMANT_SETTINGS.index(nFormants)].tolist()
+		return (f1, f2) if f1 and f2 else None
+
+	def Measure(self, wav, steps):
+		## measures the tracks of a wav file at steps (times in multiples of TRACK_STEP) and saves them with its existing track
+		## (only times that aren't in the track already are measured)
+		with self.measuring:
+			steps = np.unique(np.asarray(steps, dtype = np.int64))
+			old = self.GetTrack(wav)
+			old = np.array(old) if old is not None else np.zeros(0, self.dtype)
+			steps = np.setdiff1d(steps, np.round(old['time']/TRACK_STEP).astype(np.int64))
+			if not len(steps): return
+			new = np.zeros(len(steps), self.dtype)
+			new['time'] = steps*TRACK_STEP
+			## frames close together are analysed together (reading their audio in one go)
+			breaks = np.flatnonzero(np.diff(steps) > 2*FORMANT_WINDOW/TRACK_STEP) + 1
+			for group in np.split(np.arange(len(steps)), breaks):
+				for frames in np.array_split(group, len(group)//TRACK_GROUP_FRAMES + 1):
+					if not len(frames): continue
+					rate, windows = AnalysisFrames(wav, new['time'][frames])
+					for i, nFormants in enumerate(FORMANT_SETTINGS):
+						frequencies = FrameFormants(rate, windows, nFormants)[0][:,:2]
+						new['formants'][frames, i] = np.nan_to_num(frequencies).astype(np.int16)
+			track = np.concatenate([old, new])
+			track = track[np.argsort(track['time'], kind = 'mergesort')]
+			self.Save(wav, track)
+
+	def MeasureTimes(self, wav, times):
+		## measures the tracks of a wav file at times (in seconds, rounded to TRACK_STEP like Lookup does)
+		self.Measure(wav, np.floor(np.asarray(times, dtype = float)/TRACK_STEP + 0.5))
+
+	def Save(self, wav, track):
+		## writes a track to the cache directory (or keeps it in memory if it can't be written)
+		path = self.TrackPath(wav)
+		with self.lock:
+			self.tracks.pop(wav, None) ## let go of the old memory map before replacing the file
+			try:
+				if not isdir(self.directory):
+					os.makedirs(self.directory)
+				with open(path+'.tmp', 'wb') as trackFile:
+					np.save(trackFile, track)
+				if isfile(path): os.remove(path)
+				os.rename(path+'.tmp', path)
+				self.unsaved.pop(wav, None)
+			except (IOError, OSError):
+				self.unsaved[wav] = track
+
+	def MeasureInBackground(self, wav, intervals):
+		## queues the vowel intervals [(start, end), ...] (in seconds) of a wav file to be measured on the background thread
+		## (replaces whatever was queued before so only the wav that is being remeasured is measured)
+		steps = [np.arange(np.ceil(start/TRACK_STEP), np.floor(end/TRACK_STEP)+1) for start, end in intervals]
+		steps = np.unique(np.concatenate(steps + [np.zeros(0)]).astype(np.int64))
+		with self.condition:
+			self.queue = (wav, steps) if len(steps) else None
+			self.condition.notify()
+		if self.thread is None:
+			self.thread = threading.Thread(target = self.Run)
+			self.thread.daemon = True
+			self.thread.start()
+
+	def Run(self):
+		## measures the queued steps TRACK_BACKGROUND_FRAMES at a time (pausing in between so the UI isn't starved)
+		while True:
+			with self.condition:
+				while self.queue is None:
+					self.condition.wait()
+				wav, steps = self.queue
+				self.queue = (wav, steps[TRACK_BACKGROUND_FRAMES:]) if len(steps) > TRACK_BACKGROUND_FRAMES else None
+			try:
+				self.Measure(wav, steps[:TRACK_BACKGROUND_FRAMES])
+			except:
+				print >> sys.stderr, 'unable to measure formant tracks for '+wav+'\n\n'+traceback.format_exc()
+				with self.condition:
+					if self.queue is not None and self.queue[0] == wav: self.queue = None
+			time.sleep(TRACK_BACKGROUND_PAUSE)
+
+formantTracks = FormantTracks()
+
+PRAAT_BATCH_SCRIPT = 'batchMeasure.praat' # measures all vowels of one wav listed in a job file (see PraatBatch)
+
+def PraatExecutable(praat):
+	## returns the path of the praat program that can be run headless (the app on a mac is a directory)
+	if praat.rstrip('/').endswith('.app'):
+		return join(praat, 'Contents', 'MacOS', 'Praat')
+	return praat
+
+class PraatScriptRunner():
+	## runs praat scripts without opening the praat window
+	method = 'praat' # how the results were measured (see RemeasureCache)
+
+	def __init__(self, praat):
+		self.praat = PraatExecutable(praat)
+
+	def Run(self, script, args):
+		subprocess.check_output([self.praat, '--run', script] + args)
+
+def WriteBatchJob(path, jobs):
+	## writes a job file for PRAAT_BATCH_SCRIPT
+	## jobs = [(wav, timePoint, maxFormant), ...]
+	with open(path, 'w') as jobFile:
+		jobFile.write('wav\ttime\tmaxFormant\n')
+		for wav, timePoint, maxFormant in jobs:
+			jobFile.write(wav+'\t'+repr(float(timePoint))+'\t'+str(int(maxFormant))+'\n')
+
+def ReadBatchJob(path):
+	## reads a job file written by WriteBatchJob
+	with open(path) as jobFile:
+		next(jobFile)
+		return [(wav, float(timePoint), int(maxFormant)) for wav, timePoint, maxFormant in (line.rstrip('\n').split('\t') for line in jobFile)]
+
+def ReadBatchResults(path):
+	## reads the output of PRAAT_BATCH_SCRIPT
+	## returns {job index : (f1, f2)} (undefined measurements are left out)
+	results = {}
+	if not isfile(path): return results
+	with open(path) as output:
+		for line in output:
+			try:
+				row, f1, f2 = line.split('\t')
+				results[int(row)-1] = (int(f1), int(f2))
+			except ValueError:
+				continue ## --undefined--
+	return results
+
+class PraatBatch():
+	## remeasures many vowels in one pass: all (wav, timePoint, maxFormant) jobs are written to a single job file
+	## and PRAAT_BATCH_SCRIPT is run once per wav file (each wav is only opened once)
+	## runner is a PraatScriptRunner (or anything with the same Run method)
+	def __init__(self, runner):
+		self.runner = runner
+
+	def Measure(self, jobs, callback = None):
+		## returns {job index : (f1, f2)} for jobs = [(wav, timePoint, maxFormant), ...]
+		## callback(number of wavs done, wav) is called before each wav is measured, measuring stops if it returns False
+		results = {}
+		directory = tempfile.mkdtemp(prefix = 'fvr')
+		jobFile = join(directory, 'jobs.txt')
+		WriteBatchJob(jobFile, jobs)
+		wavs = sorted(set(wav for wav, timePoint, maxFormant in jobs))
+		try:
+			for i, wav in enumerate(wavs):
+				if callback and callback(i, wav) is False: break
+				outputFile = join(directory, str(i)+'.txt')
+				self.runner.Run(join(os.getcwd(), PRAAT_BATCH_SCRIPT), [jobFile, wav, outputFile])
+				results.update(ReadBatchResults(outputFile))
+		finally:
+			for f in os.listdir(directory):
+				os.remove(join(directory, f))
+			os.rmdir(directory)
+		return results
+
+## settings for talking to praat with sendpraat (see PraatController)
+PRAAT_TIMEOUT = 10 # seconds before a praat or sendpraat call is given up on
+PRAAT_RETRIES = 10 # number of times a sendpraat command is tried again while praat isn't running (it may still be starting up)
+PRAAT_RETRY_DELAY = 0.5 # seconds between tries
+PRAAT_NOT_RUNNING = 'not running' # part of sendpraat's error when there is no praat to send to (so the command didn't arrive)
+
+class PraatTimeout(Exception):
+	pass
+
+def RunWithTimeout(args, timeout):
+	## runs a command like subprocess.check_output but kills it if it takes longer than timeout seconds
+	## (output goes to a temporary file rather than a pipe so that a killed command's children can't keep us waiting)
+	with tempfile.TemporaryFile() as outputFile:
+		process = subprocess.Popen(args, stdout = outputFile, stderr = subprocess.STDOUT)
+		timedOut = threading.Event()
+		def Kill():
+			timedOut.set()
+			process.kill()
+		timer = threading.Timer(timeout, Kill)
+		timer.start()
+		try:
+			process.wait()
+		finally:
+			timer.cancel()
+		outputFile.seek(0)
+		output = outputFile.read()
+	if timedOut.is_set():
+		raise PraatTimeout(' '.join(args)+' took longer than '+str(timeout)+' seconds')
+	if process.returncode:
+		raise subprocess.CalledProcessError(process.returncode, args, output)
+	return output
+
+class PraatController():
+	## talks to praat on a worker thread so the plot never waits for praat or sendpraat
+	## requests are run one at a time in the order they were made, each is a list of sendpraat commands
+	## (a command is the list of arguments after the sendpraat executable)
+	## when a request is done onDone() is called on the main thread, or onError(error) if one of its commands failed
+	## a command is only sent again if sendpraat says praat isn't running (any other failure might have reached praat
+	## and commands like Log 1 mustn't run twice)
+	## a command can also be a (command, fallback) pair, fallback is sent if praat reports an error running command
+	def __init__(self, sendpraat = SENDPRAAT, timeout = PRAAT_TIMEOUT, retries = PRAAT_RETRIES, retryDelay = PRAAT_RETRY_DELAY):
+		self.sendpraat = sendpraat # path of sendpraat (tests can use a fake one)
+		self.timeout = timeout
+		self.retries = retries
+		self.retryDelay = retryDelay
+		self.queue = [] # [(praat, commands, onDone, onError), ...]
+		self.condition = threading.Condition()
+		self.thread = None # started with the first request
+
+	def Open(self, praat, commands, onDone = None, onError = None):
+		## sends the commands to praat, starting praat first if it isn't running
+		self.Queue(praat, commands, onDone, onError)
+
+	def Send(self, commands, onDone = None, onError = None):
+		## sends the commands to praat
+		self.Queue(None, commands, onDone, onError)
+
+	def Queue(self, praat, commands, onDone, onError):
+		with self.condition:
+			self.queue.append((praat, commands, onDone, onError))
+			self.condition.notify()
+		if self.thread is None:
+			self.thread = threading.Thread(target = self.Run)
+			self.thread.daemon = True
+			self.thread.start()
+
+	def Launch(self, praat):
+		## starts the praat app (only called when praat isn't running, see SendCommand)
+		if OPEN:
+			RunWithTimeout([OPEN, praat], self.timeout)
+		else:
+			subprocess.Popen([praat]) ## praat keeps running so there is nothing to wait for
+
+	def SendCommand(self, command, praat = None):
+		## runs sendpraat, trying again while praat isn't running
+		## if praat (the path of the app) is given, it is started when the first try finds it isn't running
+		for attempt in range(self.retries+1):
+			try:
+				return RunWithTimeout([self.sendpraat] + command, self.timeout)
+			except subprocess.CalledProcessError as error:
+				if PRAAT_NOT_RUNNING not in (error.output or '') or attempt == self.retries: raise
+				if praat and attempt == 0:
+					self.Launch(praat)
+				time.sleep(self.retryDelay)
+
+	def SendCommands(self, commands, praat = None):
+		## sends the commands of a request in order (praat is only started by the first one, see SendCommand)
+		for i, command in enumerate(commands):
+			launch = praat if i == 0 else None
+			if isinstance(command, tuple):
+				command, fallback = command
+				try:
+					self.SendCommand(command, launch)
+				except subprocess.CalledProcessError as error:
+					if PRAAT_NOT_RUNNING in (error.output or ''): raise
+					self.SendCommand(fallback)
+			else:
+				self.SendCommand(command, launch)
+
+	def Run(self):
+		while True:
+			with self.condition:
+				while not self.queue:
+					self.condition.wait()
+				praat, commands, onDone, onError = self.queue.pop(0)
+			try:
+				self.SendCommands(commands, praat)
+			except Exception as error:
+				if onError: wx.CallAfter(onError, error)
+			else:
+				if onDone: wx.CallAfter(onDone)
+
+praatController = PraatController()
+
+MAX_PRAAT_EDITORS = 4 # number of wavs kept open in praat between remeasurements (see PraatEditors)
+
+def PraatObjectName(wav):
+	## returns the name of a wav's LongSound as it is displayed in praat
+	## (praat drops the extension and replaces everything but letters, digits and underscores with underscores)
+	return re.sub(r'[^\w]', '_', os.path.splitext(basename(wav))[0])
+
+class PraatEditors():
+	## keeps track of the wavs that are open in praat so consecutive remeasurements reuse the same editor
+	## (only the zoom and cursor are changed, if the user has closed the editor in praat it is opened again)
+	## when more than maxEditors wavs are open the least recently used one is removed from praat
+	def __init__(self, maxEditors = MAX_PRAAT_EDITORS):
+		self.maxEditors = maxEditors
+		self.open = collections.OrderedDict() # {wav : name in praat} least recently used first
+
+	def ZoomCommands(self, wav, timePoint, maxFormant, logPath):
+		## returns the sendpraat commands that show wav at timePoint (opening it if needed)
+		## an open wav's editor is reused, falling back to opening it if that fails (see PraatController.SendCommands)
+		commands = []
+		name = PraatObjectName(wav)
+		if wav in self.open:
+			self.open[wav] = self.open.pop(wav) ## most recently used
+			commands.append((self.ZoomCommand(wav, timePoint, maxFormant, logPath, True), 
+							 self.ZoomCommand(wav, timePoint, maxFormant, logPath, False)))
+		else:
+			## a wav with the same name can't be told apart in praat so it is closed first
+			for other in [w for w, n in self.open.items() if n == name]:
+				commands.append(self.RemoveCommand(other))
+			while len(self.open) >= self.maxEditors:
+				commands.append(self.RemoveCommand(next(iter(self.open))))
+			self.open[wav] = name
+			commands.append(self.ZoomCommand(wav, timePoint, maxFormant, logPath, False))
+		return commands
+
+	def ZoomCommand(self, wav, timePoint, maxFormant, logPath, reuse):
+		## returns the sendpraat command that runs zoomIn.praat (reusing the wav's open editor if reuse is True)
+		return ['0', 'praat', 'execute \"'+join(os.getcwd(),'zoomIn.praat')+'\" \"' + \
+				wav + '\" \"'+logPath+ '\" ' + \
+				str(timePoint) + ' 1 '+str(maxFormant)+' '+str(int(reuse))+'"']
+
+	def RemoveCommand(self, wav):
+		## returns the sendpraat command that removes a wav's LongSound (and closes its editor)
+		## (nocheck because the user may have removed it in praat already)
+		return ['praat', 'nocheck removeObject: "LongSound '+self.open.pop(wav)+'"']
+
+	def Forget(self):
+		## called when praat has stopped responding (eg. it was closed), the wavs will be opened again next time
+		self.open.clear()
+
+praatEditors = PraatEditors()
+
+PRAAT_LOG_NAME = 'praatLog' # name of the log file praat writes measurements to (in a new directory for each remeasurement)
+PRAAT_LOG_POLL = 0.2 # seconds between checks of the log file when it can't be watched with inotify
+
+class InotifyWatch():
+	## waits for files in a directory to change using linux's inotify (through ctypes)
+	## raises OSError (or AttributeError) where inotify isn't available
+	IN_MODIFY = 0x2
+	IN_CLOSE_WRITE = 0x8
+	IN_MOVED_TO = 0x80
+	IN_CREATE = 0x100
+
+	def __init__(self, directory):
+		libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno = True)
+		self.fd = libc.inotify_init()
+		if self.fd < 0:
+			raise OSError(ctypes.get_errno(), 'inotify_init failed')
+		if libc.inotify_add_watch(self.fd, directory, self.IN_MODIFY|self.IN_CLOSE_WRITE|self.IN_MOVED_TO|self.IN_CREATE) < 0:
+			os.close(self.fd)
+			raise OSError(ctypes.get_errno(), 'unable to watch '+directory)
+
+	def Wait(self, timeout):
+		## returns True if something changed within timeout seconds
+		ready = select.select([self.fd], [], [], timeout)[0]
+		if ready:
+			os.read(self.fd, 4096) ## the events themselves aren't needed
+		return bool(ready)
+
+	def Close(self):
+		os.close(self.fd)
+
+class StatWatch():
+	## waits for a file to change by checking its size and modification time every PRAAT_LOG_POLL seconds
+	def __init__(self, path):
+		self.path = path
+		self.last = self.Stat()
+
+	def Stat(self):
+		try:
+			stat = os.stat(self.path)
+			return (stat.st_size, stat.st_mtime)
+		except OSError:
+			return None
+
+	def Wait(self, timeout):
+		time.sleep(min(timeout, PRAAT_LOG_POLL))
+		current = self.Stat()
+		changed, self.last = current != self.last, current
+		return changed
+
+	def Close(self):
+		pass
+
+class PraatLogWatcher():
+	## watches the log file praat writes measurements to (Query > Log 1) during one remeasurement
+	## new lines are read from where the last read stopped and passed to onLines(lines) on the main thread
+	def __init__(self, onLines):
+		self.onLines = onLines
+		self.directory = tempfile.mkdtemp(prefix = 'fvr')
+		self.path = join(self.directory, PRAAT_LOG_NAME)
+		self.offset = 0 # bytes of the log that have been read
+		self.pending = [] # lines read but not yet passed to onLines
+		self.lock = threading.Lock()
+		self.stopped = threading.Event()
+		try:
+			self.watch = InotifyWatch(self.directory)
+		except (OSError, AttributeError):
+			self.watch = StatWatch(self.path)
+		self.thread = threading.Thread(target = self.Run)
+		self.thread.daemon = True
+		self.thread.start()
+
+	def ReadNewLines(self):
+		## returns the complete lines added to the log since the last read
+		try:
+			with open(self.path, 'rb') as log:
+				log.seek(0, os.SEEK_END)
+				if log.tell() < self.offset: self.offset = 0 ## the log was started again
+				log.seek(self.offset)
+				data = log.read()
+		except IOError:
+			return []
+		end = data.rfind('\n') + 1 ## a line that is still being written is read next time
+		self.offset += end
+		return data[:end].splitlines()
+
+	def Run(self):
+		while not self.stopped.is_set():
+			if self.watch.Wait(0.5) and not self.stopped.is_set():
+				lines = self.ReadNewLines()
+				if lines:
+					with self.lock:
+						self.pending.extend(lines)
+					wx.CallAfter(self.Deliver)
+
+	def Deliver(self):
+		## runs on the main thread: passes the lines read so far to onLines (unless watching has stopped)
+		if self.stopped.is_set(): return
+		with self.lock:
+			lines, self.pending = self.pending, []
+		if lines: self.onLines(lines)
+
+	def Stop(self):
+		## stops watching, removes the log and returns any lines that haven't been passed to onLines yet
+		self.stopped.set()
+		self.thread.join()
+		self.watch.Close()
+		lines = self.pending + self.ReadNewLines()
+		self.pending = []
+		for f in os.listdir(self.directory):
+			os.remove(join(self.directory, f))
+		os.rmdir(self.directory)
+		return lines
+
+def ParsePraatLog(lines):
+	## reads measurements from lines of a praat log written with the log settings in zoomIn.praat
+	## returns [(time, (f1, f2)), ...] (measurements where praat couldn't find the formants are left out)
+	## (this currently gets the pitch as well but currently it isn't really used so it does nothing with the pitch value)
+	measurements = []
+	for line in lines:
+		info = line.split('\t')
+		try:
+			measurements.append( (float(info[0]), (int(info[1]), int(info[2])) ) )
+		except (ValueError, IndexError):
+			continue ## --undefined--
+	return measurements
+
+REMEASURE_CACHE = 'remeasure_cache.txt' # remeasurement results kept between sessions (see RemeasureCache)
+FINGERPRINT_BYTES = 1 << 20 # bytes read from each end of a wav file to fingerprint it (see RemeasureCache.Key)
+
+class RemeasureCache():
+	## remembers remeasurement results so remeasuring the same vowel again doesn't measure it again
+	## results are keyed by (wav key, time, max formant, method) where the wav key is a fingerprint of the wav's contents
+	## (see Key) so results are forgotten when the wav changes but still found if the wav is copied or moved 
+	## and the cache file can be shared with the same corpus on another machine
+	## the file is tab separated: wav key, time, max formant, method, f1, f2 (new results are appended, the last one wins)
+	def __init__(self, path = REMEASURE_CACHE):
+		self.path = path
+		self.results = None # {(wav key, method) : {(time, max formant) : (f1, f2)}} (read when first needed)
+		self.lock = threading.Lock()
+		self.keys = {} # {absolute path of a wav : ((size, modification time), wav key)} so unchanged wavs aren't read again
+
+	def Key(self, wav):
+		## returns the key of a wav file's results: a hash of its size, header and the first and last FINGERPRINT_BYTES
+		## (so it is quick for any size of wav)
+		stat = os.stat(wav)
+		path, local = os.path.abspath(wav), (stat.st_size, stat.st_mtime)
+		if path in self.keys and self.keys[path][0] == local:
+			return self.keys[path][1]
+		fingerprint = hashlib.sha1(str(stat.st_size))
+		with open(wav, 'rb') as wavFile:
+			fingerprint.update(wavFile.read(FINGERPRINT_BYTES))
+			if stat.st_size > FINGERPRINT_BYTES:
+				wavFile.seek(max(FINGERPRINT_BYTES, stat.st_size - FINGERPRINT_BYTES))
+				fingerprint.update(wavFile.read(FINGERPRINT_BYTES))
+		self.keys[path] = (local, fingerprint.hexdigest())
+		return self.keys[path][1]
+
+	def Load(self):
+		if self.results is not None: return
+		self.results = {}
+		try:
+			with open(self.path) as cacheFile:
+				for line in cacheFile:
+					try:
+						wavKey, timePoint, maxFormant, method, f1, f2 = line.rstrip('\n').split('\t')
+						self.results.setdefault((wavKey, method), {})[(float(timePoint), int(maxFormant))] = (int(f1), int(f2))
+					except ValueError:
+						continue
+		except IOError:
+			pass
+
+	def Get(self, wav, timePoint, maxFormant, method):
+		## returns the cached (f1, f2) or None
+		try:
+			wavKey = self.Key(wav)
+		except (IOError, OSError):
+			return None
+		with self.lock:
+			self.Load()
+			return self.results.get((wavKey, method), {}).get((round(timePoint, 4), int(maxFormant)))
+
+	def Between(self, wav, start, end, maxFormant, method):
+		## returns [(time, (f1, f2)), ...] of all cached results between start and end (in seconds)
+		try:
+			wavKey = self.Key(wav)
+		except (IOError, OSError):
+			return []
+		with self.lock:
+			self.Load()
+			return sorted((t, formants) for (t, m), formants in self.results.get((wavKey, method), {}).items()
+							if m == maxFormant and start <= t <= end)
+
+	def Put(self, wav, method, measurements):
+		## caches remeasurements of a wav: measurements = [(time, max formant, (f1, f2)), ...]
+		if not measurements: return
+		try:
+			wavKey = self.Key(wav)
+		except (IOError, OSError):
+			return
+		lines = []
+		with self.lock:
+			self.Load()
+			results = self.results.setdefault((wavKey, method), {})
+			for timePoint, maxFormant, formants in measurements:
+				key, formants = (round(timePoint, 4), int(maxFormant)), (int(formants[0]), int(formants[1]))
+				if results.get(key) == formants: continue
+				results[key] = formants
+				lines.append('\t'.join([wavKey, repr(key[0]), str(key[1]), method, str(formants[0]), str(formants[1])])+'\n')
+			if not lines: return
+			try:
+				with open(self.path, 'a') as cacheFile:
+					cacheFile.writelines(lines)
+			except IOError:
+				pass ## still cached for this session
+
+remeasureCache = RemeasureCache()
+
+def MeasureBatchJobs(rowJobs, runner, callback = None):
+	## remeasures vowels with PraatBatch (each wav is opened in praat only once), can run on a worker thread
+	## rowJobs = [(row, (wav, timePoint, maxFormant)), ...] (see VowelButton.BatchJobs) and callback is passed to PraatBatch.Measure
+	## returns {row : [(maxFormant, (f1, f2)), ...]}
+	## jobs that were measured before are read from the remeasurement cache (see RemeasureCache)
+	jobs = []
+	owners = [] # row of each job
+	measured = {}
+	for row, job in rowJobs:
+		formants = remeasureCache.Get(job[0], job[1], job[2], runner.method)
+		if formants:
+			measured.setdefault(row, []).append((job[2], formants))
+		else:
+			jobs.append(job)
+			owners.append(row)
+	results = PraatBatch(runner).Measure(jobs, callback) if jobs else {}
+	newResults = {} # {wav : [(time, max formant, (f1, f2)), ...]}
+	for i in sorted(results):
+		measured.setdefault(owners[i], []).append((jobs[i][2], results[i]))
+		newResults.setdefault(jobs[i][0], []).append((jobs[i][1], jobs[i][2], results[i]))
+	for wav, measurements in newResults.items():
+		remeasureCache.Put(wav, runner.method, measurements)
+	for row in measured:
+		measured[row].sort()
+	return measured
+
+class LabelCodes():
+	## maps labels (words, cmu/other labels, file names, etc.) to small integer codes
+	## so that they can be stored in the numpy arrays of a VowelStore
+	def __init__(self):
+		self.labels = [] # labels in order of their code
+		self.codes = {} # {label : code}
+
+	def Encode(self, label):
+		## returns the code for the label (a new code is made the first time a label is seen)
+		try:
+			return self.codes[label]
+		except KeyError:
+			self.codes[label] = len(self.labels)
+			self.labels.append(label)
+			return self.codes[label]
+
+	def Decode(self, code):
+		## returns the label for the code
+		return self.labels[code]
+
+	def Lookup(self, label):
+		## returns the code for the label without adding it (-1 if the label has never been encoded)
+		return self.codes.get(label, -1)
+
+class AlternatesColumn():
+	## list-like column holding the alternate measurements of each vowel ([(setting, (f1,f2)), ...], see DecodeAlternates)
+	## the alternates of all vowels are kept in flat arrays (see FlattenAlternates) so that whole files can be added 
+	## (and read from the parse cache) without making python lists, a vowel's list is only made when it is needed
+	def __init__(self, settingType):
+		self.settingType = settingType # type of the alternate settings (float for duration percentages, int for max formants)
+		self.rows = 0 # number of vowels in the column
+		self.length = 0 # number of alternates in the flat arrays
+		self.starts = np.zeros(0, np.int64) # position of each vowel's first alternate in the flat arrays
+		self.counts = np.zeros(0, np.int32) # number of alternates for each vowel
+		self.settings = np.zeros(0, np.float64)
+		self.f1s = np.zeros(0, np.int32)
+		self.f2s = np.zeros(0, np.int32)
+
+	def __len__(self):
+		return self.rows
+
+	def __getitem__(self, row):
+		start, end = self.starts[row], self.starts[row] + self.counts[row]
+		return [(self.settingType(a), (f1, f2)) for a, f1, f2 in zip(self.settings[start:end].tolist(), self.f1s[start:end].tolist(), self.f2s[start:end].tolist())]
+
+	def extend(self, alternates):
+		## adds the alternates for each vowel in alternates
+		self.ExtendFlat(*FlattenAlternates(alternates))
+
+	def ExtendFlat(self, counts, settings, f1s, f2s):
+		## adds vowels from the arrays made by FlattenAlternates
+		rows, length = len(counts), len(settings)
+		self.starts, self.counts = [Grow(a, self.rows, self.rows+rows) for a in (self.starts, self.counts)]
+		self.settings, self.f1s, self.f2s = [Grow(a, self.length, self.length+length) for a in (self.settings, self.f1s, self.f2s)]
+		self.starts[self.rows:self.rows+rows] = self.length + np.cumsum(counts) - counts
+		self.counts[self.rows:self.rows+rows] = counts
+		self.settings[self.length:self.length+length] = settings
+		self.f1s[self.length:self.length+length] = f1s
+		self.f2s[self.length:self.length+length] = f2s
+		self.rows += rows
+		self.length += length
+
+def Grow(array, used, n):
+	## returns array (or a copy with its first used items) with room for at least n items (grows by doubling)
+	if n <= len(array): return array
+	grown = np.zeros(max(n, 2*len(array), 1024), array.dtype)
+	grown[:used] = array[:used]
+	return grown
+
+def FlattenAlternates(alternates):
+	## converts a list of alternates for each vowel ([(setting, (f1,f2)), ...], see DecodeAlternates) to arrays 
+	## (number of alternates for each vowel, settings, f1s, f2s) which are much faster to store, send between processes and cache
+	flat = [a for alts in alternates for a in alts]
+	return (np.array([len(alts) for alts in alternates], dtype = np.int32), np.array([a[0] for a in flat], dtype = np.float64),
+			np.array([a[1][0] for a in flat], dtype = np.int32), np.array([a[1][1] for a in flat], dtype = np.int32))
+
+class VowelStore():
+	## columnar storage for every vowel read from the info files (and every alternate made when remeasuring)
+	## each vowel is a row id indexing into the arrays below, VowelButton instances are views onto a single row
+	## {column : (dtype, value for empty/missing values)}
+	columns = {	'f1' : (np.int32, 0),
+				'f2' : (np.int32, 0),
+				'start' : (np.float64, 0),
+				'end' : (np.float64, 0),
+				'timePoint' : (np.float64, 0),
+				'maxFormant' : (np.int32, 0),
+				'stress' : (np.int8, 0),
+				'cmu' : (np.int16, -1), # code in self.cmuCodes
+				'other' : (np.int32, -1), # code in self.otherCodes (-1 == no other label)
+				'word' : (np.int32, -1), # code in self.wordCodes
+				'pronunciation' : (np.int32, -1), # code in self.pronunciationCodes (-1 == None)
+				'index' : (np.int32, -1), # -1 == None
+				'pitch' : (np.int32, -1), # -1 == None
+				'line' : (np.int32, 0), # row in the info file this vowel appears in 
+				'file' : (np.int32, -1), # code in self.fileCodes
+				'original' : (np.int32, -1), # row id of the vowel an alternate was made from (-1 == not an alternate)
+				'bitmap' : (np.int8, 0), # index of the current bitmap key in BITMAP_KEYS
+				'x' : (np.int32, 0), # position on the plot (only meaningful if placed)
+				'y' : (np.int32, 0),
+				'pixel' : (np.int64, -1), # (x,y) packed into one integer, vowels drawn on the same pixel share a value
+				'inRange' : (np.bool_, False), # vowel is within the current formant max/mins (set when placing)
+				'alive' : (np.bool_, False), # vowel is on the plot (used for formant max/mins, word lists, etc.)
+				'counted' : (np.bool_, False), # vowel's formants are in the plot's FormantBounds (alive or a remeasurement option)
+				'visible' : (np.bool_, False), # vowel is shown on the plot (its label buttons are pressed)
+				'placed' : (np.bool_, False)} # vowel has a position on the plot
+	## columns holding the alternate measurements of each vowel (see AlternatesColumn) {column : type of the alternate settings}
+	alternateColumns = {'durationAlternates' : float, 'maxFormantAlternates' : int}
+
+	def __init__(self):
+		self.size = 0 # number of rows in use
+		self.capacity = 0 # number of rows allocated
+		for name, (dtype, fill) in self.columns.items():
+			setattr(self, name, np.empty(0, dtype))
+		for name, settingType in self.alternateColumns.items():
+			setattr(self, name, AlternatesColumn(settingType))
+		self.cmuCodes = LabelCodes()
+		self.otherCodes = LabelCodes()
+		self.wordCodes = LabelCodes()
+		self.pronunciationCodes = LabelCodes()
+		self.fileCodes = LabelCodes() # labels are (wav file, info file) pairs
+
+	def Reserve(self, n):
+		## makes sure there is room for n rows (grows arrays by doubling so appending stays cheap)
+		if n <= self.capacity: return
+		capacity = max(n, 2*self.capacity, 1024)
+		for name, (dtype, fill) in self.columns.items():
+			column = np.full(capacity, fill, dtype)
+			column[:self.size] = getattr(self, name)[:self.size]
+			setattr(self, name, column)
+		self.capacity = capacity
+
+	def Extend(self, values, n):
+		## adds n rows to the store and returns their row ids
+		## values = {column : sequence of n values}, columns not in values keep their empty value
+		## alternate columns take a list of alternates for each row or the arrays made by FlattenAlternates
+		start = self.size
+		self.Reserve(start+n)
+		for name in self.columns:
+			if name in values:
+				getattr(self, name)[start:start+n] = values[name]
+		for name in self.alternateColumns:
+			if isinstance(values.get(name), tuple):
+				getattr(self, name).ExtendFlat(*values[name])
+			else:
+				getattr(self, name).extend(values[name] if name in values else [[]]*n)
+		self.size += n
+		return range(start, start+n)
+
+	def CopyRow(self, row, **values):
+		## adds a copy of row to the store (with the column values in values replaced) and returns its row id
+		## the copy is not on the plot (not alive, visible or placed) until it is added explicitly
+		newValues = {name : [getattr(self, name)[row]] for name in self.columns.keys()+self.alternateColumns.keys()}
+		newValues.update({'alive' : [False], 'counted' : [False], 'visible' : [False], 'placed' : [False]})
+		newValues.update({name : [v] for name,v in values.items()})
+		return self.Extend(newValues, 1)[0]
+
+class SpatialGrid():
+	## uniform grid index over the plot positions of placed vowels
+	## answers rectangle, radius and nearest point queries by only looking at the grid cells 
+	## that overlap the query (instead of checking every vowel on the plot)
+	def __init__(self, cellSize = 16):
+		self.cellSize = cellSize
+		self.Build(np.empty(0, int), np.empty(0, np.int32), np.empty(0, np.int32), (0,0))
+		self.dirty = True
+
+	def Invalidate(self):
+		## marks the index as out of date (positions changed), it is rebuilt before the next query
+		self.dirty = True
+
+	def Build(self, rows, x, y, size):
+		## builds the index for the vowels in rows at positions (x,y) on a plot of size (width, height)
+		## points outside of the plot are put in the closest cell on the edge of the grid
+		self.width = max(int(size[0]) // self.cellSize + 1, 1)
+		self.height = max(int(size[1]) // self.cellSize + 1, 1)
+		cells = self.CellIds(x, y)
+		order = np.argsort(cells, kind = 'mergesort')
+		self.rows = np.asarray(rows)[order]
+		self.x = np.asarray(x)[order]
+		self.y = np.asarray(y)[order]
+		## vowels in cell c are self.rows[self.starts[c]:self.starts[c+1]]
+		self.starts = np.searchsorted(cells[order], np.arange(self.width*self.height + 1))
+		self.dirty = False
+
+	def CellIds(self, x, y):
+		## returns the id of the cell containing each (x,y) point
+		cx = np.clip(np.asarray(x) // self.cellSize, 0, self.width-1)
+		cy = np.clip(np.asarray(y) // self.cellSize, 0, self.height-1)
+		return cy*self.width + cx
+
+	def Candidates(self, x0, y0, x1, y1):
+		## returns indexes (into self.rows) of all points in the cells overlapping the rectangle
+		cx0, cx1 = [min(max(int(i) // self.cellSize, 0), self.width-1) for i in (x0, x1)]
+		cy0, cy1 = [min(max(int(i) // self.cellSize, 0), self.height-1) for i in (y0, y1)]
+		## cells in one grid row are next to each other in self.rows so each grid row is one slice
+		slices = [np.arange(self.starts[cy*self.width+cx0], self.starts[cy*self.width+cx1+1]) for cy in range(cy0, cy1+1)]
+		return np.concatenate(slices) if slices else np.empty(0, int)
+
+	def InRect(self, x0, y0, x1, y1):
+		## returns rows of all points with x0 <= x <= x1 and y0 <= y <= y1
+		i = self.Candidates(x0, y0, x1, y1)
+		x, y = self.x[i], self.y[i]
+		return self.rows[i[(x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)]]
+
+	def InRadius(self, px, py, r):
+		## returns rows of all points within r pixels of (px,py)
+		i = self.Candidates(px-r, py-r, px+r, py+r)
+		dx, dy = self.x[i]-px, self.y[i]-py
+		return self.rows[i[dx*dx + dy*dy <= r*r]]
+
+	def Nearest(self, px, py, maxDistance, mask = None):
+		## returns the row of the point closest to (px,py) (no further than maxDistance pixels away) or None
+		## mask is an optional boolean array over all rows, only rows where mask is True are considered
+		i = self.Candidates(px-maxDistance, py-maxDistance, px+maxDistance, py+maxDistance)
+		if mask is not None:
+			i = i[mask[self.rows[i]]]
+		dx, dy = self.x[i]-px, self.y[i]-py
+		dist = dx*dx + dy*dy
+		if not len(i) or dist.min() > maxDistance*maxDistance: return None
+		return int(self.rows[i[np.argmin(dist)]])
+
+class FormantBounds():
+	## multiset of (f1, f2) values that keeps track of the min and max of each formant as values are added and removed
+	## values are counted in arrays indexed by integer Hz so updates don't need to look at every vowel on the plot
+	def __init__(self):
+		self.counts = [np.zeros(0, np.int64), np.zeros(0, np.int64)] # number of f1/f2 values at each Hz (starting at the origin)
+		self.origins = [0, 0] # Hz value of the first item in each counts array
+		self.bounds = [None, None] # (min, max) of each formant (None if there are no values)
+
+	def Add(self, f1s, f2s):
+		## adds the values in f1s and f2s (sequences of the same length)
+		self.Update(f1s, f2s, 1)
+
+	def Remove(self, f1s, f2s):
+		## removes the values in f1s and f2s (they must have been added before)
+		self.Update(f1s, f2s, -1)
+
+	def Update(self, f1s, f2s, change):
+		for i, values in enumerate([f1s, f2s]):
+			values = np.asarray(values, dtype = np.int64)
+			if not len(values): continue
+			low, high = int(values.min()), int(values.max())
+			self.Fit(i, low, high)
+			np.add.at(self.counts[i], values - self.origins[i], change)
+			if self.bounds[i] is None:
+				self.bounds[i] = (low, high)
+			elif change > 0:
+				self.bounds[i] = (min(low, self.bounds[i][0]), max(high, self.bounds[i][1]))
+			else:
+				## only need to look for new bounds between the old ones if a bound was removed
+				low, high = self.bounds[i]
+				origin = self.origins[i]
+				if not self.counts[i][low-origin] or not self.counts[i][high-origin]:
+					left = np.flatnonzero(self.counts[i][low-origin:high-origin+1])
+					self.bounds[i] = (int(left[0])+low, int(left[-1])+low) if len(left) else None
+
+	def Fit(self, i, low, high):
+		## grows the counts array of formant i so that it covers low to high Hz
+		counts, origin = self.counts[i], self.origins[i]
+		if not len(counts):
+			self.counts[i], self.origins[i] = np.zeros(high-low+1, np.int64), low
+			return
+		before = max(origin-low, 0)
+		after = max(high-(origin+len(counts)-1), 0)
+		if before or after:
+			self.counts[i] = np.concatenate([np.zeros(before, np.int64), counts, np.zeros(after, np.int64)])
+			self.origins[i] = origin - before
+
+	def Get(self):
+		## returns (minF1, maxF1, minF2, maxF2) or () if there are no values
+		if None in self.bounds: return ()
+		return self.bounds[0] + self.bounds[1]
+
+def StoreColumn(name, convert, missing = None):
+	## makes a read-only VowelButton attribute that reads its value from a VowelStore column
+	## values equal to missing are returned as None (used for optional settings)
+	def getter(self):
+		value = getattr(self.store, name)[self.row]
+		return None if missing is not None and value == missing else convert(value)
+	return property(getter)
+
+## keys passed to VowelButton.SetBitmap (None == the vowel's own cmu circle)
+BITMAP_KEYS = (None, 'org', 'alt')
+
+class VowelButton(object):
 	## class defining vowel instances on plot panel
 	## for speed reasons, this class does not inheret from any wx object (ie. staticbitmap)
+	## and it does not hold any values itself: it is a view onto a row in PlotPanel.store
+	## that can be created whenever it is needed (two views of the same row are equal)
 	## click events are handled in the plotpanel
-	def __init__(self,parent, lineInFile, cmuType, formants, word, stress, 
-					timeRange, timePoint, maxFormant,
-					index, wav, infoFile, pronunciation = None, durationAlternates = [], maxFormantAlternates = [], 
-					otherType = '', pitch = None, alternate = False, original = None): 
+	def __init__(self, parent, row):
 		self.parent = parent
-		self.line = lineInFile ## row in the file this vowel appears in (used to save changes back to the file later) 
-		self.position = None
-		self.show = False
-		## define vowel values
-		self.cmuType = cmuType
-		self.f1 = formants[0]
-		self.f2 = formants[1]
-		self.word = word
-		self.stress = stress
-		self.min = timeRange[0]
-		self.max = timeRange[1]
-		self.duration = (self.max-self.min)
-		self.timePoint = timePoint
-		self.timePercentage = (self.timePoint-self.min)/self.duration
-		self.pronunciation = pronunciation
-		self.index = index
-		self.wav = wav
-		self.infoFile = infoFile
-		self.environment = (pronunciation[index-1] if index != 0 else '#') + ' v ' + (pronunciation[index+1] if index != len(pronunciation)-1 else '#') if pronunciation and index else '' 
-		self.maxFormant = maxFormant
-		self.pitch = pitch
-		self.otherType = otherType.decode('utf8') if otherType else ''
-		self.durationAlternateValues = durationAlternates
-		self.maxFormantAlternateValues = maxFormantAlternates
-		## Set bitmaps
-		self.circleBitmap = self.parent.GetPreloadedBitmap(self.cmuType)
-		self.currentBitmap = self.circleBitmap
-		## remeasurement settings
-		self.alternates = []
-		self.original = original
-		## add values to appropriate dicts and sets
-		self.parent.AddVowelValues(self, self.f1, self.f2, self.word, self.duration, self.cmuType, self.otherType)
+		self.store = parent.store
+		self.row = int(row)
+
+	def __eq__(self, other):
+		return isinstance(other, VowelButton) and self.row == other.row
+
+	def __ne__(self, other):
+		return not self == other
+
+	def __hash__(self):
+		return hash(self.row)
+
+	## define vowel values
+	line = StoreColumn('line', int) ## row in the file this vowel appears in (used to save changes back to the file later) 
+	f1 = StoreColumn('f1', int)
+	f2 = StoreColumn('f2', int)
+	stress = StoreColumn('stress', int)
+	min = StoreColumn('start', float)
+	max = StoreColumn('end', float)
+	timePoint = StoreColumn('timePoint', float)
+	maxFormant = StoreColumn('maxFormant', int)
+	index = StoreColumn('index', int, -1)
+	pitch = StoreColumn('pitch', int, -1)
+
+	@property
+	def cmuType(self):
+		return self.store.cmuCodes.Decode(self.store.cmu[self.row])
+
+	@property
+	def otherType(self):
+		code = self.store.other[self.row]
+		return self.store.otherCodes.Decode(code) if code >= 0 else ''
+
+	@property
+	def word(self):
+		return self.store.wordCodes.Decode(self.store.word[self.row])
+
+	@property
+	def pronunciation(self):
+		code = self.store.pronunciation[self.row]
+		return list(self.store.pronunciationCodes.Decode(code)) if code >= 0 else None
+
+	@property
+	def wav(self):
+		return self.store.fileCodes.Decode(self.store.file[self.row])[0]
+
+	@property
+	def infoFile(self):
+		return self.store.fileCodes.Decode(self.store.file[self.row])[1]
+
+	@property
+	def duration(self):
+		return self.max-self.min
+
+	@property
+	def timePercentage(self):
+		return (self.timePoint-self.min)/self.duration
+
+	@property
+	def environment(self):
+		pronunciation, index = self.pronunciation, self.index
+		return (pronunciation[index-1] if index != 0 else '#') + ' v ' + (pronunciation[index+1] if index != len(pronunciation)-1 else '#') if pronunciation and index else '' 
+
+	@property
+	def durationAlternateValues(self):
+		return self.store.durationAlternates[self.row]
+
+	@property
+	def maxFormantAlternateValues(self):
+		return self.store.maxFormantAlternates[self.row]
+
+	@property
+	def circleBitmap(self):
+		return self.parent.GetPreloadedBitmap(self.cmuType)
+
+	@property
+	def currentBitmap(self):
+		return self.parent.GetPreloadedBitmap(BITMAP_KEYS[self.store.bitmap[self.row]] or self.cmuType)
+
+	@property
+	def position(self):
+		## (x,y) position on the plot or None if the vowel hasn't been placed
+		return (int(self.store.x[self.row]), int(self.store.y[self.row])) if self.store.placed[self.row] else None
+
+	@property
+	def original(self):
+		## vowel this alternate was made from (None if this is not an alternate)
+		row = self.store.original[self.row]
+		return VowelButton(self.parent, row) if row >= 0 else None
+
+	@original.setter
+	def original(self, vowel):
+		self.store.original[self.row] = vowel.row if vowel else -1
 
 	def __str__(self):
 		## used for displaying all relevant vowel info
@@ -159,60 +1836,30 @@ class VowelButton():
 
 	def Play(self):
 		## plays corresponding wav file in self.timerange
-		## read chunk from wav file corresponding to the vowel
-		wav = wave.open(self.wav)
-		frameRate = wav.getframerate()
-		nChannels = wav.getnchannels()
-		sampWidth = wav.getsampwidth()
-		start = int(self.min*frameRate)
-		end = int(self.max*frameRate)
-		wav.setpos(start)
-		wavChunk = wav.readframes(end-start)
-		wav.close()
-		## create temporary wav file containing the vowel sound
-		tempWav = wave.open('temp.wav', 'w')
-		tempWav.setnchannels(nChannels)
-		tempWav.setsampwidth(sampWidth)
-		tempWav.setframerate(frameRate)
-		tempWav.writeframes(wavChunk)
-		tempWav.close()
-		## play the new wav file then remove it 
-		sound = wx.Sound('temp.wav')
-		sound.Play()
-		try: os.remove('temp.wav')
-		except: pass
+		## the vowel's frames are read from the shared audio cache and played from memory (see AudioCache and PlayWavData)
+		self.parent.playingSound = PlayWavData(audioCache.GetClip(self.wav, self.min, self.max))
 		## This does the same thing as above but requires SoX to run 
 		# subprocess.call(['play',self.wav,'trim', str(self.min), '='+str(self.max)]) 
 
 	def MakeAlternate(self, altValues, altType):  
 		## creates alternate vowel buttons when remeasuring 
-		## usually then sent to self.alternates
+		## (each alternate is a copy of this vowel's row in the store with new formant values)
 		## altValues = (timePercentage OR maxFormant OR timePoint, (alternateF1, alternateF2))
 		## altType = ('d' OR 'm') ... duration or maxformant
 		alternates = []
 		for a in altValues:
-			alt = VowelButton(	parent = self.parent,
-								lineInFile = self.line,
-								cmuType = self.cmuType,
-								formants = a[1],
-								word = self.word,
-								stress = self.stress,
-								timeRange = (self.min, self.max),
-								timePoint = a[0]*self.duration+self.min if altType == 'd' else self.timePoint if altType == 'm' else a[0],
-								pronunciation = self.pronunciation,
-								maxFormant = a[0] if altType == 'm' else self.maxFormant,
-								index = self.index,
-								wav = self.wav,
-								infoFile = self.infoFile,
-								durationAlternates = [d for d in self.durationAlternateValues + [(self.timePercentage, (self.f1,self.f2))] \
-														if a != d] if altType == 'd' else self.durationAlternateValues,
-								maxFormantAlternates = [m for m in self.maxFormantAlternateValues + [(self.maxFormant, (self.f1,self.f2))] if a != m] \
-														if altType == 'm' else self.maxFormantAlternateValues,
-								otherType = self.otherType,
-								pitch = self.pitch,
-								alternate = True,
-								original = self) 
-			alternates.append(alt)
+			row = self.store.CopyRow(self.row,
+									f1 = a[1][0],
+									f2 = a[1][1],
+									timePoint = a[0]*self.duration+self.min if altType == 'd' else self.timePoint if altType == 'm' else a[0],
+									maxFormant = a[0] if altType == 'm' else self.maxFormant,
+									durationAlternates = [d for d in self.durationAlternateValues + [(self.timePercentage, (self.f1,self.f2))] \
+															if a != d] if altType == 'd' else self.durationAlternateValues,
+									maxFormantAlternates = [m for m in self.maxFormantAlternateValues + [(self.maxFormant, (self.f1,self.f2))] if a != m] \
+															if altType == 'm' else self.maxFormantAlternateValues,
+									original = self.row,
+									bitmap = 0)
+			alternates.append(VowelButton(self.parent, row))
 		return alternates
 
 	def GetAdjustedBitmapPosition(self):
@@ -223,44 +1870,22 @@ class VowelButton():
 
 	def Hide(self):
 		## set show setting to false
-		try: 
-			self.parent.visibleVowels.remove(self)
-		except:
-			pass
+		self.store.visible[self.row] = False
+		self.parent.InvalidatePlotLayer()
 
 	def Show(self):
 		## set show setting
-		self.parent.visibleVowels.add(self)
+		self.store.visible[self.row] = True
+		self.parent.InvalidatePlotLayer()
 
-	def SetBitmap(self, bm):
-		## set current bitmap value
-		self.currentBitmap = bm
+	def SetBitmap(self, key = None):
+		## set current bitmap value (key is one of BITMAP_KEYS)
+		self.store.bitmap[self.row] = BITMAP_KEYS.index(key)
+		self.parent.InvalidatePlotLayer()
 
 	def PlaceBitmap(self):
-		## places the vowels on the plot or hides them if they are out of range
-		f1Min, f1Max, f2Min, f2Max = self.parent.maxmins
-		## if in range of maxmin formants or if the vowel is an alternate (has a self.original value)
-		## to be displayed properly all vowels must have a position (alternate values receive position here after they are created)
-		if self.original or f1Max >= self.f1 >= f1Min and f2Max >= self.f2 >= f2Min:
-			plotWidth, plotHeight = self.parent.GetAdjustedSize()
-			x = plotWidth - int(plotWidth * (float(self.f2-f2Min)/(f2Max-f2Min))) + 10
-			y = int(plotHeight * (float(self.f1-f1Min)/(f1Max-f1Min))) + 10
-			## set position
-			self.position = (x,y)
-			## add position to positions dict and positionKeys set
-			try:
-				self.parent.positions[self.position].append(self)
-			except:
-				self.parent.positionKeys.add(self.position)
-				self.parent.positions[self.position] = []
-				self.parent.positions[self.position].append(self)
-			
-			## now hide alternate vowels that are off the plot (now that they have received a position value)
-			if self.original and (f1Max >= self.f1 >= f1Min or f2Max >= self.f2 >= f2Min):
-				self.Hide()
-
-		else:
-			self.Hide()
+		## places the vowel on the plot or hides it if it is out of range (see PlotPanel.PlaceRows)
+		self.parent.PlaceRows([self.row])
 
 
 
@@ -273,100 +1898,141 @@ class VowelButton():
 				self.parent.GetTopLevelParent().toolBarPanel.cancelButton.button.Enable() 
 				remeasureMode = self.parent.GetTopLevelParent().toolBarPanel.reMeasureButton.GetMode()
 				# create remeasurements or open praat and wait
-				self.SetBitmap(self.parent.GetPreloadedBitmap('org'))
+				self.SetBitmap('org')
 				if remeasureMode == 'F':
-					self.alternates = self.MakeAlternate(self.maxFormantAlternateValues, 'm')
+					## (values measured in praat by a batch remeasurement are newer than the ones in the info file)
+					alternates = self.MakeAlternate(self.parent.batchAlternates.get(self.row) or self.maxFormantAlternateValues or self.TrackAlternateValues('m'), 'm')
 				elif remeasureMode == 'D':
-					self.alternates = self.MakeAlternate(self.durationAlternateValues, 'd')
+					alternates = self.MakeAlternate(self.durationAlternateValues or self.TrackAlternateValues('d'), 'd')
+				elif remeasureMode == 'L':
+					alternates = self.MakeAlternate(self.EstimateAlternateValues(), 'm')
 				else:
 					self.parent.vowelInFocus = self
 					self.parent.SetRemeasurePermissions(False)
 					self.MakePraatAlternates()
 					return None
-				self.parent.remeasureOptions.append(self)
+				self.parent.AddRemeasureOption(self)
 				# change bitmaps of all relevant vowels
-				self.parent.CalculateFormantMaxMins()
-				rePlaceCheck = False
-				for a in self.alternates:
-					a.SetBitmap(self.parent.GetPreloadedBitmap('alt'))
-					self.parent.remeasureOptions.append(a)
-					## check if the plot needs to be remeasured
-					if a.f1 in self.parent.maxmins[:2] or a.f2 in self.parent.maxmins[2:]:
-						rePlaceCheck = True
+				for a in alternates:
+					a.SetBitmap('alt')
+					self.parent.AddRemeasureOption(a)
 				self.parent.SetRemeasurePermissions(False)
 				self.parent.vowelInFocus = self				
-				## update the plotpanel
-				if rePlaceCheck:
+				## update the plotpanel (replace everything if the alternates changed the formant max/mins)
+				if self.parent.CalculateFormantMaxMins():
 					self.parent.PlaceVowels()
 				else:
 					self.parent.PlaceVowels(altsOnly = True)
 
-	def ReadPraatAlternates(self):
-		## Reads the new vowel values remeasured in Praat
-		## called in order to display the alternate vowels from Praat
-		## (this currently gets the pitch as well but currently it isn't really used
-		## so it does nothing with the pitch value)
-		with open('praatLog', 'r+') as pLog:
-			alts = []
-			for line in pLog:
-				info = line.split('\t')
-				alts.append( (float(info[0]), (int(info[1]), int(info[2])) ) )
-			pLog.truncate(0)
-			return alts
+	def EstimateAlternateValues(self):
+		## estimates the formants at the vowel's time point for each number of formants in FORMANT_SETTINGS
+		## (other than the vowel's own setting) without using Praat
+		## values are read from the wav's formant tracks if they have been measured (see FormantTracks)
+		## or from earlier estimates (see RemeasureCache)
+		## returns [(number of formants, (f1, f2)), ...] like maxFormantAlternateValues
+		alternates = []
+		estimated = [] # new estimates to cache
+		for nFormants in FORMANT_SETTINGS:
+			if nFormants == self.maxFormant: continue
+			formants = formantTracks.Lookup(self.wav, self.timePoint, nFormants) or remeasureCache.Get(self.wav, self.timePoint, nFormants, 'lpc')
+			if formants:
+				alternates.append((nFormants, formants))
+				continue
+			try:
+				formants = EstimateFormants(self.wav, self.timePoint, nFormants)
+			except:
+				print >> sys.stderr, 'unable to estimate formants for vowel:\n\n'+str(self)
+				break
+			if len(formants) >= 2:
+				alternates.append((nFormants, (int(formants[0][0]), int(formants[1][0]))))
+				estimated.append((self.timePoint, nFormants, alternates[-1][1]))
+		remeasureCache.Put(self.wav, 'lpc', estimated)
+		return alternates
+
+	def TrackAlternateValues(self, altType):
+		## reads alternates from the wav's formant tracks (see FormantTracks) 
+		## used when the info file has no alternate columns
+		## altType = 'd' for DURATION_PERCENTAGES of the duration or 'm' for each number of formants in FORMANT_SETTINGS
+		## times that haven't been measured yet are measured now and the rest of the wav's vowels in the background
+		if altType == 'd':
+			times = [self.min+percentage*self.duration for percentage in DURATION_PERCENTAGES]
+		else:
+			times = [self.timePoint]
+		if not formantTracks.IsMeasured(self.wav, times):
+			try:
+				formantTracks.MeasureTimes(self.wav, times)
+			except:
+				print >> sys.stderr, 'unable to measure formant tracks for vowel:\n\n'+str(self)
+			formantTracks.MeasureInBackground(self.wav, self.parent.WavIntervals(self.wav))
+		alternates = []
+		if altType == 'd':
+			for percentage in DURATION_PERCENTAGES:
+				formants = formantTracks.Lookup(self.wav, self.min+percentage*self.duration, self.maxFormant)
+				if formants and abs(percentage - self.timePercentage) >= 0.01:
+					alternates.append((percentage, formants))
+		else:
+			for nFormants in FORMANT_SETTINGS:
+				formants = formantTracks.Lookup(self.wav, self.timePoint, nFormants)
+				if formants and nFormants != self.maxFormant:
+					alternates.append((nFormants, formants))
+		return alternates
+
+	def BatchJobs(self):
+		## returns the (wav, timePoint, maxFormant) jobs to remeasure this vowel with PraatBatch
+		## (one for each number of formants in FORMANT_SETTINGS other than the vowel's own setting)
+		return [(self.wav, self.timePoint, nFormants) for nFormants in FORMANT_SETTINGS if nFormants != self.maxFormant]
 
 	def MakePraatAlternates(self):
 		## opens praat to the vowel position
+		## (praat is opened on the praat controller's thread, see PraatController)
 		## if the path to praat is bad it prompts the user to reset it 
-		try: os.remove('praatLog')
-		except: pass
-		try:
-			## opens dialog with button to remeasure in praat
-			## this needs to be shown before opening praat or it will not remain on top of everything
-			self.parent.logDialog = PraatLogDialog(self.parent, self.wav)
-			## open praat and editor to the correct location
-			if OPEN:
-				subprocess.check_output([OPEN, self.parent.GetTopLevelParent().Praat])
-			else:
-				subprocess.check_output('"'+self.parent.GetTopLevelParent().Praat+'"')
-			subprocess.check_output([SENDPRAAT, '0', 'praat',
-							 'execute \"'+join(os.getcwd(),'zoomIn.praat')+'\" \"' + \
-							  self.wav + '\" \"'+join(os.getcwd(),'praatLog')+ '\" ' + \
-							  str(self.timePoint) + ' 1 '+str(self.maxFormant)+'"'])  
-			self.parent.remeasureOptions.append(self)
-			self.parent.Refresh()
-
-		except:
-			if wx.MessageDialog(self.parent, 'Woah, that wasn\'t Praat...\nFind the real Praat?').ShowModal() == wx.ID_OK:
-				self.parent.GetTopLevelParent().OnFindPraat(None)
+		## opens dialog with button to remeasure in praat
+		## this needs to be shown before opening praat or it will not remain on top of everything
+		## (the dialog watches the log file of this remeasurement, see PraatLogWatcher)
+		self.parent.logDialog = PraatLogDialog(self.parent, self.wav)
+		## open praat and editor to the correct location
+		## (the wav's editor is reused if it is still open from an earlier remeasurement, see PraatEditors)
+		praatController.Open(self.parent.GetTopLevelParent().Praat,
+							 praatEditors.ZoomCommands(self.wav, self.timePoint, self.maxFormant, self.parent.logDialog.watcher.path),
+							 onDone = self.OnPraatOpened, onError = self.OnPraatFailed)
+
+	def OnPraatOpened(self):
+		## called when praat has opened to the vowel position
+		if self.parent.vowelInFocus != self: return ## remeasurement was cancelled while praat was opening
+		self.parent.AddRemeasureOption(self)
+		## show the vowel's measurements from earlier remeasurements in praat (see RemeasureCache)
+		self.parent.ShowPraatAlternates(remeasureCache.Between(self.wav, self.min, self.max, self.maxFormant, 'praat'))
+		self.parent.Refresh()
+
+	def OnPraatFailed(self, error):
+		## called when praat couldn't be opened
+		praatEditors.Forget()
+		if wx.MessageDialog(self.parent, 'Woah, that wasn\'t Praat...\nFind the real Praat?').ShowModal() == wx.ID_OK:
+			self.parent.GetTopLevelParent().OnFindPraat(None)
+		if self.parent.vowelInFocus == self:
 			self.parent.GetTopLevelParent().toolBarPanel.cancelButton.OnClick(None)
 
 	def TheChosenOne(self):
 		## called when an alternate vowel is selected 
 		## redraws the vowel at new location, logs the change, etc
-		self.SetBitmap(self.circleBitmap)
+		self.SetBitmap()
 		originalVowel = self.parent.remeasureOptions[0] #first vowel in the list is the original vowel
-		if self is not originalVowel:
+		if self != originalVowel:
 			# update relevant lists
-			self.parent.allVowels.remove(originalVowel)
-			self.parent.allVowels.add(self)
+			self.parent.AddVowelValues(self)
 			#log the change and update undo button
 			self.LogChange() 
-			self.parent.GetTopLevelParent().past.append(('remeasure', originalVowel, self))
-			self.parent.GetTopLevelParent().future = [] ## clear future list
+			self.parent.GetTopLevelParent().history.Do(('remeasure', np.array([originalVowel.row]), np.array([self.row]), None))
 			self.parent.GetTopLevelParent().toolBarPanel.undoRedoButtons.CheckState()
 			# change bitmap back
-			originalVowel.SetBitmap(originalVowel.circleBitmap)
+			originalVowel.SetBitmap()
 			# remove original value so the vowel is not treated like an alternate
 			self.original = None
 		# hide remeasure options
-		rePlaceCheck = False
 		for rb in self.parent.remeasureOptions:
-			if rb is not self: 
-				self.parent.RemoveStoredVowelValues(rb, rb.f1, rb.f2, rb.word, rb.duration, rb.cmuType, rb.otherType, rb.position)
+			if rb != self: 
+				self.parent.RemoveStoredVowelValues(rb)
 				rb.Hide()
-				## check if the plot needs to be remeasured
-				if rb.f1 in self.parent.maxmins[:2] or rb.f2 in self.parent.maxmins[2:]:
-					rePlaceCheck = True
 			else:
 				rb.Show()
 		## reset to normal mode
@@ -374,8 +2040,8 @@ class VowelButton():
 		self.parent.vowelInFocus = None
 		self.parent.SetRemeasurePermissions(True)
 		self.parent.GetTopLevelParent().toolBarPanel.cancelButton.button.Disable()
-		self.parent.CalculateFormantMaxMins()
-		if rePlaceCheck:
+		## check if the plot needs to be replaced
+		if self.parent.CalculateFormantMaxMins():
 			self.parent.PlaceVowels()
 		else:
 			self.parent.Refresh()
@@ -388,29 +2054,20 @@ class VowelButton():
 		## Hides the vowel on the plot and removes it from the relevant lists
 		good, note = self.parent.GetTopLevelParent().toolBarPanel.removeButton.dialog.GetRemoveInfo()
 		self.LogChange(good, note) # log the removal as a change
-		self.parent.allVowels.remove(self)
-		self.parent.RemoveStoredVowelValues(self, self.f1, self.f2, self.word, self.duration, self.cmuType, self.otherType, self.position)
+		self.parent.RemoveStoredVowelValues(self)
 		if click:  # if called by clicking the vowel point
-			self.parent.CalculateFormantMaxMins()
-			if self.f1 in self.parent.maxmins[:2] or self.f2 in self.parent.maxmins[2:]:
+			if self.parent.CalculateFormantMaxMins():
 				self.parent.PlaceVowels() 
 			else:
 				self.parent.Refresh()
-			self.parent.GetTopLevelParent().past.append(('remove', [self], None))
-			self.parent.GetTopLevelParent().future = [] ## makes sure you can't redo something you've already modified
+			self.parent.GetTopLevelParent().history.Do(('remove', np.array([self.row]), None, (good, note)))
 			self.parent.GetTopLevelParent().toolBarPanel.undoRedoButtons.CheckState()
 		self.Hide()
 
 	def LogChange(self, state = 'changed', note = ''):
 		## Logs changes to a dict in plotpanel to save later
 		## if state == True OR False, the vowel is marked as removed, not changed
-		if state is not 'changed':
-			state = 'removed_good' if state else 'removed_bad'  
-		change = [self.line] + [str(wr) for wr in [self.timePoint, self.maxFormant ,self.f1, self.f2, state, note]]
-		try: 
-			self.parent.changes[self.infoFile] += [change]
-		except:
-			self.parent.changes[self.infoFile] = [change]
+		self.parent.LogRows([self.row], state, note)
 
 class RemoveFromPlotOptions(wx.Frame):
 	## popup window that gives options when removing vowels from the plot
@@ -638,20 +2295,20 @@ class FilterOptions(wx.Frame):
 	def GetTotalMinDur(self):
 		## get min duration from all vowels on the plot
 		try:
-			return str(int(min(self.parent.GetTopLevelParent().plotPanel.durations)*1000))
+			return str(int(self.parent.GetTopLevelParent().plotPanel.GetDurations().min()*1000))
 		except:
 			return None
 
 	def GetTotalMaxDur(self):
 		## get max duration from all vowels on the plot
 		try:
-			return str(int(max(self.parent.GetTopLevelParent().plotPanel.durations)*1000))
+			return str(int(self.parent.GetTopLevelParent().plotPanel.GetDurations().max()*1000))
 		except:
 			return None
 
 	def FindWords(self):
 		## get list of all words from vowels on the plot
-		return sorted(list(self.parent.GetTopLevelParent().plotPanel.words))
+		return self.parent.GetTopLevelParent().plotPanel.GetWords()
 
 class PhonButton(wx.Button):
 	## button subclass representing all cmu vowels
@@ -801,7 +2458,7 @@ class PraatLogDialog(wx.Dialog):
 		measureButton.SetDefault() ## doesn't do much at the moment because the dialog loses focus when clicking in Praat
 
 		measureButton.SetToolTip(wx.ToolTip('Measure formants at the cursor position in Praat\nThis is identical to Query > Log 1 in the Praat window'))
-		closeButton.SetToolTip(wx.ToolTip('Close Praat Window'))
+		closeButton.SetToolTip(wx.ToolTip('Finish remeasuring in Praat'))
 		## layout panel
 		sizer.AddSpacer(10)
 		sizer.Add(buttonSizer)
@@ -816,27 +2473,32 @@ class PraatLogDialog(wx.Dialog):
 		closeButton.Bind(wx.EVT_BUTTON, self.OnClose)
 		self.Bind(wx.EVT_CLOSE, self.OnClose)
 		# get wav name as it is displayed in praat
-		self.wavName = basename(wavFile)[:-4].replace('\s','_')
+		self.wavName = PraatObjectName(wavFile)
+		# new measurements are shown on the plot as soon as praat logs them
+		self.watcher = PraatLogWatcher(parent.ShowPraatMeasurements)
 		self.SetSizerAndFit(sizer)
 		self.Show()
 
 	def OnMeasure(self, e):
-		## calls log 1 in praat and shows the new vowel on the plot
-		try:
-			subprocess.check_output([SENDPRAAT, 'praat', 'editor: "LongSound '+self.wavName+'" ', 'Log 1'])
-		except:
+		## calls log 1 in praat (the new vowel is shown on the plot when the log changes)
+		praatController.Send([['praat', 'editor: "LongSound '+self.wavName+'" ', 'Log 1']], onError = self.OnPraatLost)
+
+	def OnPraatLost(self, error):
+		## praat has been closed (or stopped responding)
+		praatEditors.Forget()
+		if self and self.parent.logDialog == self: ## (the dialog may have been closed already)
+			self.parent.CheckRemainingPraatMeasurements(self.watcher)
 			self.parent.logDialog = None
-			self.Destroy()	
-		self.parent.ShowPraatMeasurements()
+			self.Destroy()
 
-		
 	def OnClose(self, e):
-		## closes the panel and the praat editor and prompts the user to return to the plot panel
-		try:
-			subprocess.check_output([SENDPRAAT, 'praat', 'removeObject: "LongSound '+self.wavName+'"'])
-		except:
-			pass
-		self.parent.CheckRemainingPraatMeasurements()
+		## closes the panel and prompts the user to return to the plot panel
+		## (the praat editor stays open for the next remeasurement of the same wav, see PraatEditors)
+		## measurements still being logged in praat are shown once praat has finished the commands sent before
+		parent, watcher = self.parent, self.watcher
+		praatController.Send([],
+							 onDone = lambda: parent.CheckRemainingPraatMeasurements(watcher),
+							 onError = lambda error: parent.CheckRemainingPraatMeasurements(watcher))
 		self.parent.GetTopLevelParent().RequestUserAttention()
 		self.parent.logDialog = None
 		self.Destroy()
@@ -855,6 +2517,7 @@ class DisambigDialog(wx.Dialog):
 		self.maxmins = ()
 
 		self.Place()
+		parent.PrefetchRows([v.row for v in vowels])
 
 		self.Bind(wx.EVT_PAINT, self.OnPaint)
 		self.Bind(wx.EVT_LEFT_UP, self.OnLeftClick)
@@ -958,23 +2621,162 @@ class ScrolledMessageDialog(wx.Dialog):
         sizer.Add(btnsizer, 0, wx.EXPAND|wx.ALIGN_CENTER_VERTICAL|wx.ALL, 5)    
         self.SetSizerAndFit(sizer)
 
+class ProgressWindow(wx.Frame):
+	## small window with a progress bar and a cancel button for work that runs in the background
+	## (unlike wx.ProgressDialog it doesn't disable the main window so the plot can still be used)
+	def __init__(self, parent, title, message, maximum, onCancel):
+		wx.Frame.__init__(self, parent, title = title, style = wx.CAPTION|wx.FRAME_FLOAT_ON_PARENT|wx.FRAME_TOOL_WINDOW)
+		self.onCancel = onCancel
+		## define sizers and controls
+		sizer = wx.BoxSizer(wx.VERTICAL)
+		self.message = wx.StaticText(self, label = message)
+		self.gauge = wx.Gauge(self, range = maximum, size = (300, -1))
+		cancelButton = wx.Button(self, wx.ID_CANCEL)
+		## arrange controls in the sizer
+		sizer.Add(self.message, flag = wx.EXPAND|wx.ALL, border = 10)
+		sizer.Add(self.gauge, flag = wx.EXPAND|wx.LEFT|wx.RIGHT, border = 10)
+		sizer.Add(cancelButton, flag = wx.ALIGN_RIGHT|wx.ALL, border = 10)
+		self.SetSizerAndFit(sizer)
+		## bind events
+		cancelButton.Bind(wx.EVT_BUTTON, self.OnCancel)
+		self.CentreOnParent()
+		self.Show()
+
+	def Update(self, value, message):
+		## shows how much of the work is done
+		self.gauge.SetValue(value)
+		self.message.SetLabel(message)
+
+	def OnCancel(self, e):
+		self.onCancel()
+
+class InfoFileLoader():
+	## reads vowel info files on a worker thread and adds the vowels to the plot as each file is read
+	## (so the plot can be used while the rest of the files are loading)
+	## a progress window shows how many files are loaded and can cancel loading the remaining files
+	## (cancelling takes effect straight away, files that are still being read are dropped)
+	def __init__(self, plotPanel, files, badFiles):
+		self.plotPanel = plotPanel
+		self.files = files # (wav, info) file pairs to load
+		self.badFiles = badFiles # files that couldn't be accessed (reported when loading is finished)
+		self.loaded = [] # file pairs that have been added to the plot
+		self.errorDict = {} # {info file name : rows that couldn't be parsed}
+		self.cancelled = threading.Event()
+		top = plotPanel.GetTopLevelParent()
+		self.tasks = [(infoFile, top.configDict, top.fileDelim, top.fileHRow) for wavFile, infoFile in files]
+		self.progress = None
+		if files:
+			self.progress = ProgressWindow(top, 'Loading vowels', 'Reading vowel info files...', len(files), self.Cancel)
+		self.finished = False
+		self.thread = threading.Thread(target = self.Run)
+		self.thread.daemon = True
+
+	def Start(self):
+		self.thread.start()
+
+	def Run(self):
+		## runs on the worker thread: parses the files and passes each result to the main thread
+		parsed = ParseInfoFiles(self.tasks, self.cancelled)
+		try:
+			for files in self.files:
+				if self.cancelled.is_set(): break
+				wx.CallAfter(self.AddFile, files, next(parsed))
+		except StopIteration:
+			pass ## parsing stopped because loading was cancelled
+		except:
+			print >> sys.stderr, 'unable to read vowel info files\n\n'+traceback.format_exc()
+		finally:
+			parsed.close() ## stops any parsing processes that are still running
+			wx.CallAfter(self.Finish)
+
+	def AddFile(self, files, parsed):
+		## runs on the main thread: adds the vowels from one file to the plot
+		if self.cancelled.is_set(): return
+		wavFile, infoFile = files
+		self.plotPanel.AddParsedFile(parsed, wavFile, infoFile, self.errorDict)
+		self.loaded.append(files)
+		self.progress.Update(len(self.loaded), 'Loaded '+basename(infoFile))
+
+	def Cancel(self):
+		## runs on the main thread: stops loading the remaining files without waiting for the worker thread
+		self.cancelled.set()
+		self.Finish()
+
+	def Finish(self):
+		## runs on the main thread once the worker thread is done (or loading is cancelled)
+		if self.finished: return
+		self.finished = True
+		if self.progress:
+			self.progress.Destroy()
+		top = self.plotPanel.GetTopLevelParent()
+		notLoaded = [f for f in self.files if f not in self.loaded]
+		if notLoaded:
+			## forget files that were cancelled so they can be opened again
+			top.openFiles = [f for f in top.openFiles if f not in notLoaded]
+			top.LogRecentlyOpenedFiles()
+		## display warning message if a line wasn't processed
+		if self.errorDict:
+			message = 'Unable to parse the following vowel instances\n'+'\n'.join(['In file '+str(k)+': rows '+', '.join([str(v) for v in values]) for k,values in self.errorDict.items()])+'\n\nPlease check the files or reconfigure the info reader\n(File > Configure Info Reader)'
+			ScrolledMessageDialog(self.plotPanel, message).ShowModal()
+		if self.badFiles:
+			message = 'Unable to access the following files:\n'+'\n'.join(self.badFiles)
+			ScrolledMessageDialog(self.plotPanel, message).ShowModal()
+
+class BatchRemeasurer():
+	## remeasures vowels in praat on a worker thread (see MeasureBatchJobs) so the plot can be used in the meantime
+	## the new values are added to PlotPanel.batchAlternates when they are all measured
+	## a progress window shows how many wavs are done and can cancel the wavs that haven't been started
+	## (the vowels measured before cancelling are still kept)
+	def __init__(self, plotPanel, rows, runner):
+		self.plotPanel = plotPanel
+		self.rows = rows
+		self.runner = runner
+		self.rowJobs = plotPanel.BatchJobs(rows) # (the store is only read on the main thread)
+		self.cancelled = threading.Event()
+		self.finished = False
+		wavs = len(set(job[0] for row, job in self.rowJobs))
+		self.progress = ProgressWindow(plotPanel.GetTopLevelParent(), 'Remeasuring vowels', 'Measuring vowels in Praat...', wavs, self.cancelled.set)
+		self.thread = threading.Thread(target = self.Run)
+		self.thread.daemon = True
+
+	def Start(self):
+		self.thread.start()
+
+	def Run(self):
+		## runs on the worker thread
+		try:
+			measured = MeasureBatchJobs(self.rowJobs, self.runner, self.Update)
+		except (OSError, subprocess.CalledProcessError):
+			measured = None
+		wx.CallAfter(self.Finish, measured)
+
+	def Update(self, done, wav):
+		## called by PraatBatch on the worker thread before each wav is measured (returns False to stop)
+		wx.CallAfter(self.progress.Update, done, 'Measuring '+basename(wav))
+		return not self.cancelled.is_set()
+
+	def Finish(self, measured):
+		## runs on the main thread once the worker thread is done
+		self.finished = True
+		self.progress.Destroy()
+		top = self.plotPanel.GetTopLevelParent()
+		if measured is None:
+			if wx.MessageDialog(top, 'Woah, that wasn\'t Praat...\nFind the real Praat?').ShowModal() == wx.ID_OK:
+				top.OnFindPraat(None)
+			return
+		self.plotPanel.batchAlternates.update(measured)
+		wx.MessageDialog(top, 'Remeasured '+str(len(measured))+' of '+str(len(self.rows))+' vowels\nRemeasure a vowel using FORMANTS to see the new values', style = wx.OK).ShowModal()
+
 class PlotPanel(wx.Panel):
 	## panel containing all plotted vowels
 	def __init__(self, parent):
 		## init panel and values
 		wx.Panel.__init__(self, parent = parent, style=wx.SUNKEN_BORDER)
+		self.store = VowelStore() ## values, plot positions and visibility of all vowels (see VowelStore)
+		self.spatialIndex = SpatialGrid() ## index of vowel positions for finding vowels by position (see GetSpatialIndex)
 		# f1/f2 max mins
-		self.f1s = {} ## dictionary of {f1 : int} where int == the number of vowels on the plot with that f1 value
-		self.f2s = {} ## dictionary of {f2 : int} where int == the number of vowels on the plot with that f2 value
 		self.maxmins = () # (minF1, maxF1, minF2, maxF2) of all vowels on the plot
-		self.words = {} ## dictionary of {word : int} where int == the number of vowels on the plot in that word
-		self.durations = {} ## dictionary of {dur : int} where int == the number of vowels on the plot with that duration value
-		self.cmus = {} ## dictionary of {cmuLabel: [vowels]} where vowels are all vowels with that cmuType
-		self.others = {} ## dictionary of {otherLabel: [vowels]} where vowels are all vowels with that otherType
-		self.positions = {} ## dictionary of {(x,y):[vowels]} where (x,y) are the coordinates on the plot and vowels are all vowels with those coordinates
-		self.positionKeys = set() ## keeps track of all positions of vowels in allVowels for quick retrieval when more than 121 vowels are visible
-		self.visibleVowels = set() ## set of all visible vowels on the plot
-		self.allVowels = set() # all vowels
+		self.formantBounds = FormantBounds() # formants of all vowels on the plot and remeasurement options (see CountRows)
 		self.cmuLabels = [] # vowels with a cmu value in this list will be shown
 		self.otherLabels = [] # vowels with an other value in this list will be shown
 		self.remeasureOptions = [] # contains vowel instances of remeasured vowels
@@ -984,11 +2786,20 @@ class PlotPanel(wx.Panel):
 		self.zooming = False # if true: panel is waiting to zoom 
 		self.removing = False # if true: waiting to remove vowels
 		self.drawing = False # if true: currently drawing a box on the overlay
-		self.changes = {} # stores all changes to vowels (saving reads from here)
+		self.changes = {} # stores the latest change to each changed line of each info file {info file : {line : change}} (saving reads from here)
+		self.originalValues = {} # the values each info file was loaded with (to tell when a change puts a vowel back the way it was, see StoreChange)
+		self.recoveredChanges = {} # changes from the change journal that weren't saved last time, restored as their files are loaded (see ReplayChanges)
 		self.overlay = wx.Overlay() # draws zoombox to this overlay
 		self.ignoreclick = False # when set to True, the next mouse click will be ignored (used when reactivating plot panel)
 		self.stdDev = 0 ## stores current number of std devs displayed by the confidence ellipse (0 = no ellipse)
+		self.plotLayer = None ## bitmap of the grid, visible vowels and ellipse (redrawn only when one of those changes)
+		self.plotLayerValid = False
+		self.densityThreshold = DENSITY_THRESHOLD ## number of visible vowels above which vowels are drawn as a density raster
 		self.filtering = {} ## contains options for filtering vowels on the plot 
+		self.filterMask = None ## filtering compiled to a boolean array over the rows in self.store (see GetFilterMask)
+		self.filterSize = 0 ## number of rows in self.store that have been checked against the filter
+		self.filterWordsOK = np.zeros(0, dtype = bool) ## for each word code: True if the word passes the filter
+		self.wordIndex = None ## (row ids sorted by word code, start of each word code in the sorted ids) used to update the filter by word
 		## create vowel bitmaps from files to be used for vowel points on the plot
 		self.BuildVowelBitmaps()
 		## draw labels
@@ -1012,13 +2823,17 @@ class PlotPanel(wx.Panel):
 		self.Bind(wx.EVT_LEFT_UP, self.OnLeftClick)
 		self.Bind(wx.EVT_RIGHT_UP, self.OnRightClick)
 		self.Bind(wx.EVT_PAINT, self.OnPaint)
+		self.Bind(wx.EVT_ERASE_BACKGROUND, lambda e: None) ## OnPaint covers the whole panel so erasing first only causes flicker
 		self.Bind(wx.EVT_LEFT_DOWN, self.StartZoomBox)
-		self.Bind(wx.EVT_MOTION, self.DrawZoomBox)
+		self.Bind(wx.EVT_MOTION, self.OnMotion)
 
 
 		# init vowel info panel
 		self.vowelInfoPanel = VowelInfo(self)
 		self.logDialog = None
+		self.playingSound = None # sound of the vowel being played (kept so it isn't deleted while playing)
+		self.prefetchRows = () # rows near the mouse whose clips were last prefetched
+		self.batchAlternates = {} # {row : [(maxFormant, (f1, f2)), ...]} measured in praat by RemeasureInBatch
 
 
 	def OnResize(self, e):
@@ -1026,20 +2841,76 @@ class PlotPanel(wx.Panel):
 		self.PlaceVowels()
 
 	def OnPaint(self, e):
+		## copies the plot layer to the panel and draws the remeasurement options on top of it
 		dc = wx.PaintDC(self)
+		if not self.plotLayerValid or self.plotLayer.GetSize() != self.GetSize():
+			self.DrawPlotLayer()
+		dc.DrawBitmapPoint(self.plotLayer, (0,0))
+		self.DrawRows(dc, [b.row for b in self.remeasureOptions])
+
+	def InvalidatePlotLayer(self):
+		## call when anything drawn on the plot layer changes (positions, visibility, filter, bitmaps, ellipse)
+		## the layer is redrawn the next time the panel is painted
+		self.plotLayerValid = False
+
+	def DrawPlotLayer(self):
+		## draws the gridlines, visible vowels and confidence ellipse to an off-screen bitmap
+		width, height = self.GetSize()
+		if not self.plotLayer or self.plotLayer.GetSize() != (width, height):
+			self.plotLayer = wx.EmptyBitmap(max(width, 1), max(height, 1))
+		dc = wx.MemoryDC(self.plotLayer)
+		dc.SetBackground(wx.Brush(self.GetBackgroundColour()))
 		dc.Clear()
-		dc.DrawLineList(self.gridlines, pens =  wx.Pen('Grey', 1))
-		for b in self.visibleVowels:
-			if self.filtering:
-				if b.word.upper() not in self.filtering['words']: continue
-				if not self.filtering['durs'][0] <= int(b.duration*1000) <= self.filtering['durs'][1]: continue
-				if b.stress not in self.filtering['stress']: 
-					continue
-			dc.DrawBitmapPoint(b.currentBitmap, b.GetAdjustedBitmapPosition())
-		for b in self.remeasureOptions:
-			dc.DrawBitmapPoint(b.currentBitmap, b.GetAdjustedBitmapPosition())
-		if self.stdDev and self.visibleVowels:
+		rows = self.GetVisibleRows()
+		if len(rows) > self.densityThreshold:
+			## the raster covers the whole layer so the gridlines are drawn after it
+			dc.DrawBitmapPoint(self.DrawDensity(rows, width, height), (0,0))
+			dc.DrawLineList(self.gridlines, pens =  wx.Pen('Grey', 1))
+		else:
+			dc.DrawLineList(self.gridlines, pens =  wx.Pen('Grey', 1))
+			self.DrawRows(dc, rows)
+		if self.stdDev and len(rows):
 			dc.DrawBitmapPoint(*self.DrawConfidenceEllipse(self.stdDev))
+		dc.SelectObject(wx.NullBitmap)
+		self.plotLayerValid = True
+
+	def DrawRows(self, dc, rows):
+		## draws the current bitmap of each vowel in rows (row ids in self.store) at its position
+		store = self.store
+		rows = np.asarray(rows, dtype = int)
+		cmuBitmaps = [self.GetPreloadedBitmap(c) for c in store.cmuCodes.labels]
+		bitmaps = cmuBitmaps + [self.GetPreloadedBitmap(k) for k in BITMAP_KEYS[1:]]
+		## bitmap code 0 means the cmu circle, anything else is one of the other keys in BITMAP_KEYS
+		keys = store.bitmap[rows]
+		keys = np.where(keys == 0, store.cmu[rows], keys + len(cmuBitmaps) - 1)
+		## only the last of several identical bitmaps drawn on the same pixel can be seen so the others are skipped
+		drawKeys = store.pixel[rows]*len(bitmaps) + keys
+		last = np.sort(len(rows) - 1 - np.unique(drawKeys[::-1], return_index = True)[1])
+		rows, keys = rows[last], keys[last]
+		for k, x, y in zip(keys.tolist(), store.x[rows].tolist(), store.y[rows].tolist()):
+			dc.DrawBitmapPoint(bitmaps[k], (x-5, y-5))
+
+	def DrawDensity(self, rows, width, height):
+		## returns a bitmap of the vowels in rows drawn as a density raster (used when too many vowels are visible to draw individually)
+		## each cell is coloured by the average cmu colour of the vowels in it and is more opaque the more vowels it contains
+		store = self.store
+		binsX, binsY = width/DENSITY_BIN + 1, height/DENSITY_BIN + 1
+		cells = (np.clip(store.y[rows], 0, height-1)/DENSITY_BIN)*binsX + np.clip(store.x[rows], 0, width-1)/DENSITY_BIN
+		counts = np.bincount(cells, minlength = binsX*binsY).astype(float)
+		colours = np.array([colourDict[c] for c in store.cmuCodes.labels] or [(0,0,0)], dtype = float)[store.cmu[rows]]
+		filled = counts > 0
+		raster = np.empty((binsX*binsY, 3))
+		for i in range(3):
+			raster[:,i] = np.bincount(cells, weights = colours[:,i], minlength = binsX*binsY)
+		raster[filled] /= counts[filled, None]
+		## log scaling keeps sparse regions visible next to very dense ones
+		alpha = np.log1p(counts)/np.log1p(counts.max())
+		alpha[filled] = 0.25 + 0.75*alpha[filled]
+		background = np.array(self.GetBackgroundColour().Get()[:3], dtype = float)
+		raster = alpha[:,None]*raster + (1 - alpha[:,None])*background
+		## expand each cell to DENSITY_BIN x DENSITY_BIN pixels and crop to the size of the panel
+		raster = raster.reshape(binsY, binsX, 3).repeat(DENSITY_BIN, 0).repeat(DENSITY_BIN, 1)[:height, :width]
+		return wx.BitmapFromBuffer(width, height, np.ascontiguousarray(raster, dtype = np.uint8))
 
 
 	def OnLeftClick(self, e):
@@ -1052,7 +2923,8 @@ class PlotPanel(wx.Panel):
 			if self.drawing: 
 				self.RemoveInBox(pos)
 			else:
-				self.GetVowelsInClickRange(pos).RemoveVowel(True) 
+				clicked = self.GetVowelsInClickRange(pos)
+				if clicked: clicked.RemoveVowel(True) 
 		elif self.zooming:
 			self.DoTheZoom(pos) ## Note that if this fails (ie. actual click instead of end of drawing a box) self.NormalClick will be called
 		## if playing or remeasuring vowels
@@ -1084,25 +2956,21 @@ class PlotPanel(wx.Panel):
 	def GetVowelsInClickRange(self, p):
 		## gets all vowels within 5 pixels of the point (p) in any direction
 		## used to figure out which vowel is clicked on the plot
-		xyGrid = {(x,y) for x in range(p[0]-5,p[0]+6) for y in range(p[1]-5,p[1]+6)}
-		vowels = [ v for i in xyGrid&self.positionKeys for v in self.positions[i] ]
+		store = self.store
+		rows = self.GetSpatialIndex().InRect(p[0]-5, p[1]-5, p[0]+5, p[1]+5)
+		rows = rows[store.placed[rows]]
 		if self.remeasureOptions:
-			inRange = [v for v in vowels if v in self.remeasureOptions]
-			if len(inRange) > 1:
-				self.DisambigOverlappingVowels(inRange, p)
-				return
-			else:
-				return inRange[0]
+			inRange = [v for v in self.remeasureOptions if v.row in rows]
 		else:
+			rows = rows[store.visible[rows]]
 			if self.filtering:
-				inRange = [v for v in vowels if v in self.visibleVowels and v.word.upper() in self.filtering['words'] and self.filtering['durs'][0] <= int(v.duration*1000) <= self.filtering['durs'][1] and v.stress in self.filtering['stress']]
-			else:
-				inRange = [v for v in vowels if v in self.visibleVowels]
-			if len(inRange) > 1:
-				self.DisambigOverlappingVowels(inRange, p)
-				return 
-			else:
-				return inRange[0]
+				rows = rows[self.GetFilterMask()[rows]]
+			inRange = [VowelButton(self, r) for r in rows]
+		if len(inRange) > 1:
+			self.DisambigOverlappingVowels(inRange, p)
+			return 
+		else:
+			return inRange[0] if inRange else None
 
 	def DisambigOverlappingVowels(self, vowels, pos):
 		## creates mini panel when overlapping vowels are clicked
@@ -1120,9 +2988,93 @@ class PlotPanel(wx.Panel):
 
 	def filterVowels(self, words = None, minDur = None, maxDur = None, stress = []):
 		## filter all vowels from the plot by word or duration range
-		self.filtering = {'words':words, 'durs':[int(minDur), int(maxDur)], 'stress':stress}
+		filtering = {'words':words, 'durs':[int(minDur), int(maxDur)], 'stress':stress}
+		if self.filterMask is not None and filtering['durs'] == self.filtering['durs'] and filtering['stress'] == self.filtering['stress']:
+			## only the word selection changed so only the vowels in the added or removed words need to be checked
+			changed = set(words) ^ set(self.filtering['words'])
+			self.filtering = filtering
+			self.UpdateFilterWords(changed)
+		else:
+			self.filtering = filtering
+			self.filterMask = None
+		self.InvalidatePlotLayer()
 		self.Refresh()
 
+	def SetStdDev(self, stdDev):
+		## sets the number of std devs displayed by the confidence ellipse (0 = no ellipse)
+		self.stdDev = stdDev
+		self.InvalidatePlotLayer()
+
+	def FilterMask(self, rows):
+		## returns a boolean array that is True for each vowel in rows (row ids in self.store) 
+		## that passes the current filter settings
+		store = self.store
+		return self.GetFilterWordsOK()[store.word[rows]] & self.FilterNonWordMask(rows)
+
+	def FilterNonWordMask(self, rows):
+		## returns a boolean array that is True for each vowel in rows that passes the duration and stress filters
+		store = self.store
+		durs = ((store.end[rows] - store.start[rows])*1000).astype(int)
+		return (durs >= self.filtering['durs'][0]) & (durs <= self.filtering['durs'][1]) & np.in1d(store.stress[rows], self.filtering['stress'])
+
+	def GetFilterWordsOK(self):
+		## returns a boolean array that is True for each word code whose word passes the word filter
+		## words added to self.store since the last call are checked here
+		labels = self.store.wordCodes.labels
+		if len(self.filterWordsOK) < len(labels):
+			words = set(self.filtering['words'])
+			added = np.array([w.upper() in words for w in labels[len(self.filterWordsOK):]], dtype = bool)
+			self.filterWordsOK = np.concatenate([self.filterWordsOK, added])
+		return self.filterWordsOK
+
+	def GetFilterMask(self):
+		## returns the current filter as a boolean array over all rows in self.store (None if not filtering)
+		## the mask is compiled when the filter is set and rows added to self.store afterwards are checked here
+		if not self.filtering:
+			return None
+		store = self.store
+		if self.filterMask is None:
+			self.filterMask = np.zeros(len(store.alive), dtype = bool)
+			self.filterSize = 0
+			self.filterWordsOK = np.zeros(0, dtype = bool)
+		elif len(self.filterMask) < len(store.alive):
+			self.filterMask = np.concatenate([self.filterMask, np.zeros(len(store.alive) - len(self.filterMask), dtype = bool)])
+		if self.filterSize < store.size:
+			rows = np.arange(self.filterSize, store.size)
+			self.filterMask[rows] = self.FilterMask(rows)
+			self.filterSize = store.size
+		return self.filterMask
+
+	def UpdateFilterWords(self, changed):
+		## updates the compiled filter after the words in changed were added to or removed from the word filter
+		store = self.store
+		mask = self.GetFilterMask()
+		words = set(self.filtering['words'])
+		changed = set(changed)
+		codes = [c for c, w in enumerate(store.wordCodes.labels) if w.upper() in changed]
+		if not codes:
+			return
+		self.filterWordsOK[codes] = [store.wordCodes.labels[c].upper() in words for c in codes]
+		rows = self.GetRowsByWord(codes)
+		mask[rows] = self.filterWordsOK[store.word[rows]] & self.FilterNonWordMask(rows)
+
+	def GetRowsByWord(self, codes):
+		## returns the row ids of all vowels in self.store with a word code in codes
+		store = self.store
+		if self.wordIndex is None or len(self.wordIndex[0]) != store.size:
+			order = np.argsort(store.word[:store.size], kind = 'mergesort')
+			self.wordIndex = (order, np.searchsorted(store.word[order], np.arange(len(store.wordCodes.labels) + 1)))
+		order, starts = self.wordIndex
+		return np.concatenate([order[starts[c]:starts[c+1]] for c in codes] or [np.zeros(0, dtype = int)])
+
+	def GetVisibleRows(self):
+		## returns the row ids of all vowels that are shown on the plot (visible, placed and passing the filter)
+		store = self.store
+		visible = store.visible & store.placed
+		if self.filtering:
+			visible &= self.GetFilterMask()
+		return np.flatnonzero(visible)
+
 	def GetAdjustedSize(self):
 		## gives slightly smaller plot size in order to place vowels nicely (ie. not right on the edge)
 		width, height = self.GetSize()
@@ -1197,29 +3149,26 @@ class PlotPanel(wx.Panel):
 			if self.HasCapture(): self.ReleaseMouse()
 			self.clearOverlay()
 			return
-		# update redo/undo lists
-		self.GetTopLevelParent().past.append(('remove', removeVowels, None))
-		self.GetTopLevelParent().future = [] ## clear redo list
-		self.GetTopLevelParent().toolBarPanel.undoRedoButtons.CheckState()
-		rePlaceCheck = False
 		# Hide all remeasure options if the original is in the box
 		if self.remeasureOptions and self.remeasureOptions[0].original in removeVowels:
 			for v in self.remeasureOptions:
 				v.RemoveVowel()
-				if v.f1 in self.maxmins[:2] or v.f2 in self.maxmins[2:]:
-					rePlaceCheck = True
-		# remove all vowels in the box
-		for v in removeVowels:
-			if v not in self.remeasureOptions[1:]: ## don't remove alternates if the original vowel is still there (see previous for loop)
-				v.RemoveVowel()
-				if v.f1 in self.maxmins[:2] or v.f2 in self.maxmins[2:]:
-					rePlaceCheck = True
+		# remove all vowels in the box in one go
+		## (don't remove alternates if the original vowel is still there (see previous for loop))
+		rows = np.array(sorted(v.row for v in removeVowels if v not in self.remeasureOptions[1:]), dtype = int)
+		good, note = self.GetTopLevelParent().toolBarPanel.removeButton.dialog.GetRemoveInfo()
+		self.LogRows(rows, good, note)
+		self.RemoveRows(rows)
+		self.store.visible[rows] = False
+		# update redo/undo lists
+		if len(rows):
+			self.GetTopLevelParent().history.Do(('remove', rows, None, (good, note)))
+			self.GetTopLevelParent().toolBarPanel.undoRedoButtons.CheckState()
 		# reset overlay and redraw the panel
 		if self.HasCapture(): self.ReleaseMouse()
 		self.clearOverlay()
 		self.zoomCoords = []
-		self.CalculateFormantMaxMins()
-		if rePlaceCheck:
+		if self.CalculateFormantMaxMins():
 			self.PlaceVowels()
 		else:
 			self.Refresh()
@@ -1228,7 +3177,7 @@ class PlotPanel(wx.Panel):
 
 	def ZoomIn(self):
 		## allow zooming 
-		if self.allVowels:
+		if self.store.alive.any():
 			self.zooming = True
 
 	def ResetZoom(self):
@@ -1246,8 +3195,10 @@ class PlotPanel(wx.Panel):
 		currentCoords = pos
 		x,y = currentCoords[0]-50 , currentCoords[1]-50
 		x2,y2, = currentCoords[0]+50 , currentCoords[1]+50 
-		self.CalculateFormantMaxMins(self.GetVowelsInBox((x,y), (x2,y2)))
+		vowels = self.GetVowelsInBox((x,y), (x2,y2))
+		self.CalculateFormantMaxMins(vowels)
 		self.PlaceVowels()
+		self.PrefetchRows([v.row for v in vowels])
 		self.zoomCoords = []
 
 
@@ -1269,6 +3220,34 @@ class PlotPanel(wx.Panel):
 		del odc
 		self.overlay.Reset()
 
+	def OnMotion(self, e):
+		## handler when the mouse moves over the plot
+		if e.Dragging():
+			self.DrawZoomBox(e)
+		else:
+			self.PrefetchNearCursor(e.GetPosition())
+
+	def PrefetchNearCursor(self, pos):
+		## loads the clips of the vowels nearest to the mouse in the background (closest first) so they play straight away
+		store = self.store
+		rows = self.GetSpatialIndex().InRadius(pos[0], pos[1], PREFETCH_RADIUS)
+		rows = rows[store.placed[rows] & store.visible[rows]]
+		if self.filtering:
+			rows = rows[self.GetFilterMask()[rows]]
+		rows = rows[np.argsort((store.x[rows]-pos[0])**2 + (store.y[rows]-pos[1])**2, kind = 'mergesort')][:PREFETCH_MAX_VOWELS]
+		if tuple(rows) != self.prefetchRows:
+			self.prefetchRows = tuple(rows)
+			self.PrefetchRows(rows)
+
+	def PrefetchRows(self, rows):
+		## loads the clips of the vowels in rows (in order) in the background when vowels are being played
+		if not self.GetTopLevelParent().toolBarPanel.playButton.GetPlayState():
+			return
+		store = self.store
+		rows = np.asarray(rows, dtype = int)
+		wavs = [store.fileCodes.Decode(f)[0] for f in store.file[rows].tolist()]
+		clipPrefetcher.Prefetch(zip(wavs, store.start[rows].tolist(), store.end[rows].tolist()))
+
 	def DrawZoomBox(self, e):
 		# draw a box when dragging and zooming (or removing vowels)
 		if self.zoomCoords and e.Dragging() and e.LeftIsDown():
@@ -1297,6 +3276,7 @@ class PlotPanel(wx.Panel):
 			return
 		self.CalculateFormantMaxMins(vowels)
 		self.PlaceVowels()
+		self.PrefetchRows([v.row for v in vowels])
 		# clear zoom box and redraw buttons
 		if self.HasCapture(): self.ReleaseMouse()
 		self.clearOverlay()
@@ -1308,34 +3288,35 @@ class PlotPanel(wx.Panel):
 	def GetVowelsInBox(self, topLeftPoint, bottomRightPoint):
 		## get all vowels that fall inside a drawn box:
 		# takes two point arguments that define the top-left and bottom-right of the box
-		zoomedVisibleVowels = set()
-		for b in self.visibleVowels:
-			x,y = b.position
-			if bottomRightPoint[0] >= x >= topLeftPoint[0] and bottomRightPoint[1] >= y >= topLeftPoint[1]:
-				zoomedVisibleVowels.add(b)
-		for b in self.remeasureOptions:
-			x,y = b.position
-			if bottomRightPoint[0] >= x >= topLeftPoint[0] and bottomRightPoint[1] >= y >= topLeftPoint[1]:
-				zoomedVisibleVowels.add(b)
+		store = self.store
+		rows = self.GetSpatialIndex().InRect(topLeftPoint[0], topLeftPoint[1], bottomRightPoint[0], bottomRightPoint[1])
+		rows = rows[store.placed[rows]]
+		zoomedVisibleVowels = set(VowelButton(self, r) for r in rows[store.visible[rows]])
+		zoomedVisibleVowels.update(b for b in self.remeasureOptions if b.row in rows)
 		return zoomedVisibleVowels
 
+	def GetSpatialIndex(self):
+		## returns the index of vowel positions (rebuilding it first if vowels have been placed since it was last built)
+		## Note: rows that have been taken off the plot since the index was built are still in it (check store.placed)
+		if self.spatialIndex.dirty:
+			rows = np.flatnonzero(self.store.placed)
+			self.spatialIndex.Build(rows, self.store.x[rows], self.store.y[rows], self.GetSize())
+		return self.spatialIndex
+
 
 	def DrawConfidenceEllipse(self, sdev = None):
 		# make a confidence ellipse of the points currently plotted on the screen
 		# mathy bits adapted from Jaime at: 
 		#stackoverflow.com/questions/20126061/creating-a-confidence-ellipses-in-a-sccatterplot-using-matplotlib
-		x = []
-		y = []
-		xy = []
 		# find all vowels to consider when drawing the plot
-		for b in self.visibleVowels:
-			pos = b.position
-			x.append(pos[0])
-			y.append(pos[1])
-			xy.append(pos)
-		xy.sort()
+		rows = self.GetVisibleRows()
+		x = self.store.x[rows]
+		y = self.store.y[rows]
+		# y values sorted by position
+		sortedY = y[np.lexsort((y, x))]
+		half = len(sortedY)//2
 		## mathy things that define the ellipse (thanks Jaime)
-		angleAdjust = sum([p[1] for p in xy[:len(xy)/2]])/(len(xy)/2) < sum([p[1] for p in xy[len(xy)/2:]])/(len(xy)) 
+		angleAdjust = int(sortedY[:half].sum())//half < int(sortedY[half:].sum())//len(sortedY)
 		mean = (np.mean(x) , np.mean(y))
 		cov = np.cov(x, y)
 		lambda_, v = np.linalg.eig(cov)
@@ -1368,52 +3349,15 @@ class PlotPanel(wx.Panel):
 	## functions for reading vowel information on startup
 	###--------------------------------###
 	
-	def GetHeadingLocations(self, headingList, configDict):
-		## creates dictionary of headings:column in info file 
-		## used to find vowel values 
-		locationDict = {}
-		delimiter = self.GetTopLevelParent().fileDelim
-		for i,head in enumerate(headingList.split(delimiter)):
-			head = head.strip()
-			if head in configDict and head:
-				cat = configDict[head]
-				if isinstance(cat, tuple):
-					i = (i, cat[1])
-					cat = cat[0]
-				try: locationDict[cat] += [i]
-				except: locationDict[cat] = [i]
-		locationDict = {k : v[0] if len(v)==1 else v for k,v in locationDict.iteritems()}
-		return locationDict
-
-	def DecodeAlternates(self, row, locations, altType):
-		## gets the alternate f1 and f2 values
-		## returns (alternate setting, (f1,f2)) ex. an alternate setting might be 20 for formants measured
-		## at 20% of the vowel duration...
-		alternates = []
-		for l in locations:
-			alt = self.OptionalArgHandler(row,l[0])
-			if re.sub('[ ,]','',alt):
-				alternates.append((alt, l[1]))
-		alts = [(int(i[1])/100.0 if altType == 'd' else int(i[1]), tuple(int(float(j)) for j in i[0].split(',')) ) for i in alternates]
-		return alts
-
 	def CalculateFormantMaxMins(self, vowelSet = None):
 		## calculate formant max and min for all vowels
 		## not just visible ones (use at startup and when deleting vowels)
+		## returns True if the max/mins changed (the plot needs to be replaced with PlaceVowels)
 		if not vowelSet: 
-			if self.zooming: return
-			try:
-				self.maxmins = (min(self.f1s), max(self.f1s), min(self.f2s), max(self.f2s))
-				if self.remeasureOptions:
-					f1s, f2s = [], []
-					for v in self.remeasureOptions:
-						f1,f2 = v.GetFormants()
-						f1s.append(f1)
-						f2s.append(f2) 
-					
-					self.maxmins = ( min( min(f1s), self.maxmins[0]), max(max(f1s), self.maxmins[1]) , min(min(f2s), self.maxmins[2]) , max(max(f2s), self.maxmins[3]) )
-			except:
-				return
+			if self.zooming: return False
+			## all vowels on the plot plus the vowels currently being remeasured (see CountRows)
+			maxmins = self.formantBounds.Get()
+			if not maxmins: return False
 		else:
 			allF1 = [] 
 			allF2 = []
@@ -1424,39 +3368,82 @@ class PlotPanel(wx.Panel):
 					allF2.append(f2)
 				except:
 					print >> sys.stderr, 'no formants found in vowel:\n\n'+str(b)
-			self.maxmins = (min(allF1), max(allF1), min(allF2), max(allF2))
+			maxmins = (min(allF1), max(allF1), min(allF2), max(allF2))
+		changed = maxmins != self.maxmins
+		self.maxmins = maxmins
 		self.GetTopLevelParent().toolBarPanel.filterButton.dialog.showVowelStats()
+		return changed
+
+	def CountRows(self, rows, counted = True):
+		## adds (or removes if counted is False) the formants of the vowels in rows to the formant max/min calculation
+		## rows that are already counted (or not counted) are ignored
+		store = self.store
+		rows = np.unique(np.asarray(rows, dtype = int))
+		rows = rows[store.counted[rows] != counted]
+		if not len(rows): return
+		if counted:
+			self.formantBounds.Add(store.f1[rows], store.f2[rows])
+		else:
+			self.formantBounds.Remove(store.f1[rows], store.f2[rows])
+		store.counted[rows] = counted
+
+	def AddRemeasureOption(self, vowel):
+		## adds a vowel to the remeasurement options (the formant max/mins include all remeasurement options)
+		self.remeasureOptions.append(vowel)
+		self.CountRows([vowel.row])
 
 
 	def PlaceVowels(self, altsOnly = False):
 		## places vowels on the plot according to there relative distance from formant mins/maxs
 		## option to only place alternate vowels 
 		self.DrawAxisLabels()
+		self.InvalidatePlotLayer()
 		if not altsOnly :
-			self.positions = {}
-			self.positionKeys = set()
-			for b in self.allVowels:
-				b.PlaceBitmap()
-		for b in self.remeasureOptions[1:]: ## skips first vowel instance since it is the original vowel and already placed above 
-			## this looks redundant (see for loop above) but it is faster to do them seperately since allVowels+remeasureOptions makes a new list
-			b.PlaceBitmap()
+			## the view has changed so the clips near the mouse are no longer needed
+			clipPrefetcher.Cancel()
+			self.prefetchRows = ()
+			self.store.placed[:] = False
+			self.PlaceRows(np.flatnonzero(self.store.alive))
+		## skips first vowel instance since it is the original vowel and already placed above 
+		self.PlaceRows([b.row for b in self.remeasureOptions[1:]])
 		self.Refresh()
 
+	def PlaceRows(self, rows):
+		## places the vowels in rows (row ids in self.store) on the plot in one go 
+		## by mapping their formant values to pixel coordinates, vowels that are out of range are hidden
+		rows = np.asarray(rows, dtype = int)
+		if not len(rows): return
+		store = self.store
+		f1Min, f1Max, f2Min, f2Max = self.maxmins
+		plotWidth, plotHeight = self.GetAdjustedSize()
+		f1 = store.f1[rows]
+		f2 = store.f2[rows]
+		inF1 = (f1Max >= f1) & (f1 >= f1Min)
+		inF2 = (f2Max >= f2) & (f2 >= f2Min)
+		isAlternate = store.original[rows] >= 0
+		store.inRange[rows] = inF1 & inF2
+		## vowels are placed if in range of maxmin formants or if the vowel is an alternate (has an original value)
+		## to be displayed properly all vowels must have a position (alternate values receive position here after they are created)
+		placed = isAlternate | (inF1 & inF2)
+		place = rows[placed]
+		x = plotWidth - (plotWidth * ((f2[placed] - f2Min) / float(f2Max-f2Min or 1))).astype(np.int32) + 10
+		y = (plotHeight * ((f1[placed] - f1Min) / float(f1Max-f1Min or 1))).astype(np.int32) + 10
+		store.x[place] = x
+		store.y[place] = y
+		store.pixel[place] = y.astype(np.int64)*65536 + x
+		store.placed[place] = True
+		self.spatialIndex.Invalidate()
+		self.InvalidatePlotLayer()
+		## hide vowels that are off the plot as well as alternate vowels that are partly in range (now that they have received a position value)
+		store.visible[rows[~placed | (isAlternate & (inF1 | inF2))]] = False
+
 
 	def CreateVowelsFromFiles(self, files):
 		## creates vowels from file pairs (wav,txt OR csv)
-		## get config file settings from the mainframe in order to read the files
-		configDict = self.GetTopLevelParent().configDict
-		delimiter = self.GetTopLevelParent().fileDelim
-		headingRow = self.GetTopLevelParent().fileHRow
-		## set up error holder
-		errorDict = {}
-		# initiate sort lists
-		cmus = {}
-		others = {}
+		## returns the file pairs that exist straight away (the vowels are loaded in the background, see InfoFileLoader)
 		bad_files = []
 		good_files = []
-		## interate through file pairs
+		## check that the file pairs exist
 		for wavFile , infoFile in files:
 			bad = 0
 			if not isfile(wavFile):
@@ -1468,138 +3455,168 @@ class PlotPanel(wx.Panel):
 			if bad: 
 				continue
 			good_files.append((wavFile, infoFile))
-			with open(infoFile, 'r') as info: #read file
-				for n,i in enumerate(info): # iterate through lines
-					if n < headingRow: # do nothing for lines above heading row
-						continue
-					elif n == headingRow: 
-						headingCol = self.GetHeadingLocations(i, configDict) # get column index for each heading
-						self.GetTopLevelParent().toolBarPanel.saveButton.columnIndexes[infoFile] = [headingCol['TIME'], headingCol['MAXFORMANT'], headingCol['F1'], headingCol['F2']] # set relevant column headings for saving later
-					else: # get vowel info
-						try:
-							if i.strip(): # makes sure line isn't empty
-								i = i.strip().split(delimiter) ## split the row into a list
-								## make a new button instance according to stuff in the row 
-								## (note some settings are optional)
-								f1 = int(float(i[headingCol['F1']]))
-								f2 = int(float(i[headingCol['F2']]))
-								word = i[headingCol['WORD']]
-								cmu = i[headingCol['CMU']][:2]
-								other = self.OptionalArgHandler(i,headingCol['OTHER']) if 'OTHER' in headingCol else None
-								start, stop = float(i[headingCol['START']]) , float(i[headingCol['END']]) 
-								# make button instance
-								button = VowelButton(	parent = self,
-														lineInFile = n,
-														cmuType = cmu,
-														formants = ( f1 , f2 ),
-														word = word,
-														stress = int(i[headingCol['STRESS']]),
-														timeRange = (start,stop),
-														timePoint = float(i[headingCol['TIME']]),
-														pronunciation = re.sub("[\[\]\'\ ]", '', i[headingCol['PRONUNCIATION']]).split(',') if 'PITCH' in headingCol else None,
-														maxFormant = int(i[headingCol['MAXFORMANT']]),
-														index = int(i[headingCol['INDEX']]) if 'INDEX' in headingCol else None,
-														wav = wavFile, 
-														infoFile = infoFile,
-														durationAlternates = self.DecodeAlternates(i, headingCol['DURATION_ALTERNATES'], 'd') if 'DURATION_ALTERNATES' in headingCol else [] ,
-														maxFormantAlternates = self.DecodeAlternates(i, headingCol['MAXFORMANT_ALTERNATES'], 'm') if 'MAXFORMANT_ALTERNATES' in headingCol else [],
-														otherType = other,
-														pitch = self.OptionalArgHandler(i,headingCol['PITCH'], int) if 'PITCH' in headingCol else None)	
-								## add the button instance to the appropriate lists
-								self.allVowels.add(button)
-						except:
-							try: errorDict[basename(infoFile)] += [n]
-							except: errorDict[basename(infoFile)] = [n]
-		## display warning message if a line wasn't processed
-		if errorDict:
-			message = 'Unable to parse the following vowel instances\n'+'\n'.join(['In file '+str(k)+': rows '+', '.join([str(v) for v in values]) for k,values in errorDict.items()])+'\n\nPlease check the files or reconfigure the info reader\n(File > Configure Info Reader)'
-			ScrolledMessageDialog(self, message).ShowModal()
-		if bad_files:
-			message = 'Unable to access the following files:\n'+'\n'.join(bad_files)
-			ScrolledMessageDialog(self, message).ShowModal()
-		# show vowels on the plot
-		self.CalculateFormantMaxMins() 
-		self.PlaceVowels()
-		self.OnUnionButtonPress() ## shows vowels on the plot if buttons have already been pressed
+		## parse the info files on a worker thread, the vowels are added to the plot as each file is read
+		InfoFileLoader(self, good_files, bad_files).Start()
 		return good_files
 
-	def RemoveStoredVowelValues(self, vowel, f1, f2, word, duration, cmu, other, position):
-		## removes information about vowels from the appropriate dicts and sets
-		## this should be done in conjunction with removing a vowel from allVowels and
-		## is called from self.RemoveVowel()
-		## Note that if the value in a dict is less than 0, the key will be removed
-		if self.f1s[f1] > 1: self.f1s[f1] -= 1
-		else: del self.f1s[f1]  
-
-		if self.f2s[f2] > 1: self.f2s[f2]  -= 1
-		else: del self.f2s[f2]
-
-		if self.words[word] > 1: self.words[word] -= 1
-		else: del self.words[word]
-
-		if self.durations[duration] > 1: self.durations[duration] -= 1
-		else: del self.durations[duration]
-
-		self.cmus[cmu].remove(vowel)
-		try: ## if otherType is not ''
-			self.others[other].remove(vowel)
-		except:
-			pass
-		
-		## catches when a remeasurement is cancelled and the remeasured vowels
-		## fall out of the zoomed section of the plot
-		if len(self.positions[position]) > 1: 
-			self.positions[position].remove(vowel)
-		else: 
-			del self.positions[position]
-			self.positionKeys.remove(position) 
-
-	def AddVowelValues(self, vowel, f1, f2, word, duration, cmu, other):
-		## adds information about vowels from the appropriate dicts and sets
-		## this should be done when making a new instance of this class AND when 
-		## adding a value back into PlotPanel.allVowels
-		## Note: this does not add to PlotPanel.positions dict (that is done when 
-		## 		 the vowel is first placed using VowelButton.PlaceBitmap )
-		try: self.f1s[f1] += 1 
-		except: self.f1s[f1] = 1
-
-		try: self.f2s[f2] += 1
-		except:	self.f2s[f2] = 1
-
-		try: self.words[word] += 1
-		except:	self.words[word] = 1
-		
-		try: self.durations[duration] += 1
-		except:	self.durations[duration] = 1
-		
-		self.cmus[cmu].add(vowel)
-		try: ## if otherType is not ''
-			self.others[other].add(vowel)
-		except:
-			pass
+	def AddParsedFile(self, parsed, wavFile, infoFile, errorDict):
+		## adds the vowels parsed from an info file to the plot (called by InfoFileLoader as each file is read)
+		## rows that couldn't be parsed are added to errorDict
+		headingCol = parsed['headings']
+		if headingCol is not None:
+			self.GetTopLevelParent().toolBarPanel.saveButton.columnIndexes[infoFile] = [headingCol['TIME'], headingCol['MAXFORMANT'], headingCol['F1'], headingCol['F2']] # set relevant column headings for saving later
+		self.GetTopLevelParent().toolBarPanel.saveButton.lineIndexes[infoFile] = parsed['lineIndex'] # where each line starts in the file (for saving later)
+		if parsed['errors']:
+			errorDict.setdefault(basename(infoFile), []).extend(parsed['errors'])
+		rows = self.MergeParsedColumns(parsed, wavFile, infoFile)
+		self.KeepOriginalValues(infoFile, rows)
+		self.ReplayChanges(infoFile, rows)
+		live = np.asarray(rows, dtype = int)
+		live = live[self.store.alive[live]] ## (replayed changes may have removed vowels)
+		self.CountRows(live)
+		## only the new vowels need to be placed unless they changed the formant max/mins
+		if self.CalculateFormantMaxMins():
+			self.PlaceVowels()
+		else:
+			self.PlaceRows(live)
+		self.OnUnionButtonPress() ## shows vowels on the plot if buttons have already been pressed
+		self.Refresh()
 
-	def OptionalArgHandler(self, lineList, index, returnType = str):
-		## allows some vowels to have empty info for certain settings
-		try: return returnType(lineList[index])
-		except: return None
+	def MergeParsedColumns(self, parsed, wavFile, infoFile):
+		## adds the vowels parsed from an info file (see ParseInfoFile) to the store and returns their row ids
+		## labels were coded separately in each file so the codes are translated to the store's codes here
+		store = self.store
+		columns = dict(parsed['columns'])
+		for name, codes in [('cmu', store.cmuCodes), ('other', store.otherCodes), ('word', store.wordCodes), ('pronunciation', store.pronunciationCodes)]:
+			## the last item maps local code -1 (no label) to -1 
+			translate = np.array([codes.Encode(l) for l in parsed['labels'][name]] + [-1], dtype = np.int32)
+			columns[name] = translate[columns[name]]
+		n = len(columns['line'])
+		columns.update({'file' : [store.fileCodes.Encode((wavFile, infoFile))]*n, 'alive' : [True]*n})
+		return store.Extend(columns, n)
+
+	def ReplayChanges(self, infoFile, rows):
+		## applies the changes to infoFile that were recovered from the change journal (see ChangeJournal)
+		## to its newly loaded vowels (rows) and adds them to self.changes so they are saved
+		changes = self.recoveredChanges.pop(infoFile, None)
+		if not changes: return
+		store = self.store
+		rowOfLine = dict(zip(store.line[rows].tolist(), np.asarray(rows).tolist()))
+		for c in changes:
+			row = rowOfLine.get(c[0])
+			if row is None: continue
+			store.timePoint[row], store.maxFormant[row], store.f1[row], store.f2[row] = float(c[1]), int(c[2]), int(c[3]), int(c[4])
+			store.alive[row] = c[5] == 'changed'
+			self.StoreChange(infoFile, c)
+		self.GetTopLevelParent().toolBarPanel.saveButton.CheckState()
+
+	def KeepOriginalValues(self, infoFile, rows):
+		## remembers the line, time, max formant, F1 and F2 of the vowels (rows) loaded from infoFile
+		store = self.store
+		rows = np.asarray(rows, dtype = int)
+		order = np.argsort(store.line[rows], kind = 'mergesort')
+		rows = rows[order]
+		self.originalValues[infoFile] = {'line' : store.line[rows].copy(), 'timePoint' : store.timePoint[rows].copy(), 'maxFormant' : store.maxFormant[rows].copy(),
+										'f1' : store.f1[rows].copy(), 'f2' : store.f2[rows].copy(), 'saved' : np.zeros(len(rows), dtype = bool)}
+
+	def IsOriginal(self, infoFile, change):
+		## returns True if change (see VowelButton.LogChange) leaves its line of infoFile the way it was loaded
+		original = self.originalValues.get(infoFile)
+		if original is None or change[5:] != ['changed', '']:
+			return False
+		i = np.searchsorted(original['line'], change[0])
+		if i == len(original['line']) or original['line'][i] != change[0] or original['saved'][i]:
+			return False
+		return change[1:5] == [str(float(original['timePoint'][i])), str(int(original['maxFormant'][i])), str(int(original['f1'][i])), str(int(original['f2'][i]))]
+
+	def MarkSavedLines(self, infoFile, lines):
+		## lines of infoFile have been overwritten by a save so they no longer have their original values
+		original = self.originalValues.get(infoFile)
+		if original is None: return
+		i = np.searchsorted(original['line'], lines)
+		i = i[i < len(original['line'])]
+		original['saved'][i[np.in1d(original['line'][i], lines)]] = True
+
+	def LogRows(self, rows, state = 'changed', note = ''):
+		## logs the current values of the vowels in rows as changes to save later (see VowelButton.LogChange)
+		## if state == True OR False, the vowels are marked as removed, not changed
+		if state is not 'changed':
+			state = 'removed_good' if state else 'removed_bad'  
+		store = self.store
+		rows = np.asarray(rows, dtype = int)
+		infoFiles = [store.fileCodes.Decode(code)[1] for code in store.file[rows].tolist()]
+		changes = [[line] + [str(wr) for wr in [timePoint, maxFormant, f1, f2, state, note]] for line, timePoint, maxFormant, f1, f2 in 
+					zip(store.line[rows].tolist(), store.timePoint[rows].tolist(), store.maxFormant[rows].tolist(), store.f1[rows].tolist(), store.f2[rows].tolist())]
+		changeJournal.AppendAll(zip(infoFiles, changes)) ## so the changes can be recovered if FVR crashes before saving
+		for infoFile, change in zip(infoFiles, changes):
+			self.StoreChange(infoFile, change)
+
+	def StoreChange(self, infoFile, change):
+		## keeps change as the latest change to its line of infoFile (only the last change to a line is saved)
+		## the line is dropped from self.changes if the change puts it back the way it was loaded
+		fileChanges = self.changes.setdefault(infoFile, {})
+		if self.IsOriginal(infoFile, change):
+			fileChanges.pop(change[0], None)
+			if not fileChanges:
+				del self.changes[infoFile]
+				changeJournal.MarkDone(infoFile) ## nothing left to recover for infoFile
+		else:
+			fileChanges[change[0]] = change
+
+	def RemoveStoredVowelValues(self, vowel):
+		## takes a vowel off the plot so it is no longer used when calculating formant max/mins, 
+		## the word list, durations, etc. and no longer has a position on the plot
+		## (this is called from VowelButton.RemoveVowel() and when discarding remeasurement options)
+		self.RemoveRows([vowel.row])
+
+	def RemoveRows(self, rows):
+		## takes the vowels in rows off the plot in one go (see RemoveStoredVowelValues)
+		rows = np.asarray(rows, dtype = int)
+		self.store.alive[rows] = False
+		self.store.placed[rows] = False
+		self.CountRows(rows, False)
+		self.InvalidatePlotLayer()
+
+	def AddVowelValues(self, vowel):
+		## puts a vowel (back) on the plot (used when choosing a remeasurement and when undoing a removal)
+		## Note: this does not give the vowel a position (that is done when 
+		## 		 the vowel is placed using VowelButton.PlaceBitmap )
+		self.AddRows([vowel.row])
+
+	def AddRows(self, rows):
+		## puts the vowels in rows (back) on the plot in one go (see AddVowelValues)
+		rows = np.asarray(rows, dtype = int)
+		self.store.alive[rows] = True
+		self.CountRows(rows)
+		self.InvalidatePlotLayer()
+
+	def GetWords(self):
+		## returns a sorted list of the words containing the vowels on the plot
+		return sorted(self.store.wordCodes.Decode(c) for c in np.unique(self.store.word[self.store.alive]))
+
+	def GetDurations(self):
+		## returns an array of the durations (in seconds) of the vowels on the plot
+		return self.store.end[self.store.alive] - self.store.start[self.store.alive]
 
 	###--------------------------------###
 	## the following functions deal with input from the phonPanel
 	###--------------------------------###
+
+	def LabelMask(self, column, codes, labels):
+		## returns a boolean array that is True for every row in self.store
+		## where column (store.cmu or store.other) holds one of the labels (codes is the matching LabelCodes)
+		return np.in1d(column, [c for c in (codes.Lookup(l) for l in labels) if c >= 0])
 		
 	def AddCmu(self, cmu):
 		## permits this cmu pronunciation to be displayed on the plot
 		if cmu not in self.cmuLabels:
 			self.cmuLabels.append(cmu)
-		
-		if self.GetUnionButtonState():
-			for b in self.cmus[cmu]:
-				b.Show()  
-		else:
-			for b in self.cmus[cmu]:
-				if b.otherType in self.otherLabels:
-					b.Show()
-
+		store = self.store
+		show = store.alive & self.LabelMask(store.cmu, store.cmuCodes, [cmu])
+		if not self.GetUnionButtonState():
+			show &= self.LabelMask(store.other, store.otherCodes, self.otherLabels)
+		store.visible |= show
+		self.InvalidatePlotLayer()
 
 	def RemoveCmu(self, cmu):
 		## prevents this cmu pronunciation from being displayed on the plot
@@ -1607,25 +3624,21 @@ class PlotPanel(wx.Panel):
 			self.cmuLabels.remove(cmu)
 		except:
 			pass
-
+		store = self.store
 		if self.GetUnionButtonState():
-			for b in self.cmus[cmu]:
-				if b.otherType not in self.otherLabels:
-					b.Hide()
+			store.visible &= ~(self.LabelMask(store.cmu, store.cmuCodes, [cmu]) & ~self.LabelMask(store.other, store.otherCodes, self.otherLabels))
+			self.InvalidatePlotLayer()
 
 	def AddOther(self, other):
 		## permits this other pronunciation to be displayed on the plot
 		if other not in self.otherLabels:
 			self.otherLabels.append(other)
-
-		if self.GetUnionButtonState():
-			for b in self.others[other]:
-				b.Show() 
-		else:
-			for b in self.others[other]:
-				if b.cmuType in self.cmuLabels:
-					b.Show()
-
+		store = self.store
+		show = store.alive & self.LabelMask(store.other, store.otherCodes, [other])
+		if not self.GetUnionButtonState():
+			show &= self.LabelMask(store.cmu, store.cmuCodes, self.cmuLabels)
+		store.visible |= show
+		self.InvalidatePlotLayer()
 
 	def RemoveOther(self, other):
 		## prevents this other pronunciation from being displayed on the plot
@@ -1633,67 +3646,78 @@ class PlotPanel(wx.Panel):
 			self.otherLabels.remove(other)
 		except:
 			pass
-
+		store = self.store
 		if self.GetUnionButtonState():
-			for b in self.others[other]:
-				if b.cmuType not in self.cmuLabels:
-					b.Hide()
+			store.visible &= ~(self.LabelMask(store.other, store.otherCodes, [other]) & ~self.LabelMask(store.cmu, store.cmuCodes, self.cmuLabels))
+			self.InvalidatePlotLayer()
 
 	def GetUnionButtonState(self):
 		## gets state of the union/intersect button
 		return self.GetTopLevelParent().phonPanel.unionButton.GetValue()
 
 	def OnUnionButtonPress(self): # uses OnX name even though not technically bound to an event (sorry, I like the name)
-		## updates self.visibleVowels after union button pressed
-		cmuVowels = [i for cmu in self.cmuLabels for i in self.cmus[cmu]]
-		otherVowels = [i for other in self.otherLabels for i in self.others[other]]
+		## updates which vowels are visible after union button pressed
+		store = self.store
+		cmuVowels = self.LabelMask(store.cmu, store.cmuCodes, self.cmuLabels)
+		otherVowels = self.LabelMask(store.other, store.otherCodes, self.otherLabels)
 		if self.GetUnionButtonState():
-			self.visibleVowels = set(cmuVowels + otherVowels) # using + instead of | because it is slightly faster
+			store.visible = store.alive & (cmuVowels | otherVowels)
 		else:
-			self.visibleVowels = set(cmuVowels)&set(otherVowels)
+			store.visible = store.alive & cmuVowels & otherVowels
+		self.InvalidatePlotLayer()
 
 	###--------------------------------###
 	## the following functions deal with vowel button clicks
 	###--------------------------------###
 
-	def ShowPraatMeasurements(self):
-		## when the frame comes back into focus after remeasuring in praat, show the remeasured vowel
-		## Called from PraatLogDialog
+	def ShowPraatMeasurements(self, lines):
+		## shows the vowels measured in praat as soon as they are logged
+		## Called from PraatLogWatcher with the new lines of the log
+		button = self.vowelInFocus
+		if not button: return ## remeasurement was cancelled
+		measurements = ParsePraatLog(lines)
+		remeasureCache.Put(button.wav, 'praat', [(t, button.maxFormant, formants) for t, formants in measurements])
+		self.ShowPraatAlternates(measurements)
+
+	def ShowPraatAlternates(self, measurements):
+		## shows measurements [(time, (f1, f2)), ...] of the vowel in focus as alternates
 		button = self.vowelInFocus
-		alt = button.MakeAlternate(button.ReadPraatAlternates(), 'p')[0]
-		alt.SetBitmap(self.GetPreloadedBitmap('alt'))
-		button.alternates.append(alt)
-		self.remeasureOptions.append(alt)
-		self.CalculateFormantMaxMins()
-		if alt.f1 in self.maxmins[:2] or alt.f2 in self.maxmins[2:]:
+		if not button or not measurements: return
+		alts = button.MakeAlternate(measurements, 'p')
+		for a in alts:
+			a.SetBitmap('alt')
+			self.AddRemeasureOption(a)
+		if self.CalculateFormantMaxMins():
 			self.PlaceVowels()
 		else:
-			alt.PlaceBitmap()
-		try: os.remove('praatLog')
-		except: pass
+			for a in alts:
+				a.PlaceBitmap()
 		self.Refresh()
 
-	def CheckRemainingPraatMeasurements(self):
-		## if the user uses Query >log 1 instead of clicking in praatlogdialog
-		## this will catch any measurements made
-		## Note: this will only display vowels once praatlogdialog has been closed
-		if isfile('praatLog'):
-			button = self.vowelInFocus
-			alts = button.MakeAlternate(button.ReadPraatAlternates(), 'p')
-			self.CalculateFormantMaxMins()
-			rePlaceCheck = False
-			for a in alts:
-				a.SetBitmap(self.GetPreloadedBitmap('alt'))
-				button.alternates.append(a)
-				self.remeasureOptions.append(a)
-				if a.f1 in self.maxmins[:2] or a.f2 in self.maxmins[2:]:
-					rePlaceCheck = True
-			if rePlaceCheck:
-				self.PlaceVowels()
-			else:
-				for a in alts:
-					a.PlaceBitmap()
-			self.Refresh()
+	def BatchJobs(self, rows):
+		## returns [(row, (wav, timePoint, maxFormant)), ...] to remeasure the vowels in rows (see MeasureBatchJobs)
+		return [(row, job) for row in rows for job in VowelButton(self, row).BatchJobs()]
+
+	def WavIntervals(self, wav):
+		## returns [(start, end), ...] of the vowels on the plot that are in wav (see FormantTracks.MeasureInBackground)
+		codes = [code for code, (wavFile, infoFile) in enumerate(self.store.fileCodes.labels) if wavFile == wav]
+		rows = np.flatnonzero(self.store.alive & np.in1d(self.store.file, codes))
+		return zip(self.store.start[rows].tolist(), self.store.end[rows].tolist())
+
+	def RemeasureInBatch(self, rows, runner, callback = None):
+		## remeasures the vowels in rows with PraatBatch (each wav is opened in praat only once)
+		## the results are shown as alternates when remeasuring a vowel using FORMANTS (see VowelButton.OnRemeasure)
+		## returns the number of vowels that got new alternates
+		## (BatchRemeasurer does the same with the measuring on a worker thread)
+		measured = MeasureBatchJobs(self.BatchJobs(rows), runner, callback)
+		self.batchAlternates.update(measured)
+		return len(measured)
+
+	def CheckRemainingPraatMeasurements(self, watcher):
+		## stops watching the praat log when praat is closed
+		## and shows any measurements that were logged since the log was last read
+		lines = watcher.Stop()
+		if lines: self.ShowPraatMeasurements(lines)
 
 
 class PhonPanel(wx.Panel):
@@ -1747,7 +3771,6 @@ class PhonPanel(wx.Panel):
 				button = PhonButton(self,c)
 				cmuGridSizer.Add(button, (j,i))
 				mainCmuButton.AddMinion(button)
-				self.parent.plotPanel.cmus[c] = set()
 
 		## add stuff to otherGridSizer
 		for i,col in enumerate(self.parent.other):
@@ -1757,7 +3780,6 @@ class PhonPanel(wx.Panel):
 				button = PhonButton(self,c, other = True)
 				self.otherGridSizer.Add(button, (i,j))
 				mainOtherButton.AddMinion(button)
-				self.parent.plotPanel.others[c] = set()
 		self.SetSizer(sizer)
 
 	def RedrawOtherVowels(self):
@@ -1767,7 +3789,6 @@ class PhonPanel(wx.Panel):
 		self.otherSizer.Add(mainOtherButton, flag = wx.ALIGN_CENTER)
 		self.otherGridSizer = wx.GridBagSizer(1,1)
 		self.otherSizer.Add(self.otherGridSizer)
-		otherDict = {}
 		for i,col in enumerate(self.parent.other):
 			for j,c in enumerate(col):
 				if not c or c == '-': continue
@@ -1775,13 +3796,6 @@ class PhonPanel(wx.Panel):
 				button = PhonButton(self,c, other = True)
 				self.otherGridSizer.Add(button, (i,j))
 				mainOtherButton.AddMinion(button)
-				otherDict[c] = set()
-		for b in self.parent.plotPanel.allVowels:
-			try: ## if otherType is not ''
-				otherDict[b.otherType].add(b)
-			except:
-				pass
-		self.parent.plotPanel.others = otherDict
 		self.parent.plotPanel.Refresh()
 		self.Fit()
 		self.parent.Fit()
@@ -1856,7 +3870,7 @@ class StdDevButtons(wx.Panel):
 		## toggles radiobuttons when main button is clicked and draws the ellipse (if on)
 		plotPanel = self.GetTopLevelParent().plotPanel
 		self.on = False
-		plotPanel.stdDev = 0
+		plotPanel.SetStdDev(0)
 		if self.oneButton.GetValue(): 
 			self.oneButton.SetValue(False)
 			plotPanel.clearOverlay()
@@ -1872,7 +3886,7 @@ class StdDevButtons(wx.Panel):
 		else: 
 			self.button.SetBitmapLabel(self.onBitmap)
 			self.recentlyPressed.SetValue(True)
-			plotPanel.stdDev = int(self.recentlyPressed.GetLabel())
+			plotPanel.SetStdDev(int(self.recentlyPressed.GetLabel()))
 		plotPanel.Refresh()
 			
 
@@ -1882,7 +3896,7 @@ class StdDevButtons(wx.Panel):
 		plotPanel = self.GetTopLevelParent().plotPanel
 		pressed = e.GetEventObject()
 		self.recentlyPressed = pressed
-		plotPanel.stdDev = int(pressed.GetLabel())
+		plotPanel.SetStdDev(int(pressed.GetLabel()))
 		plotPanel.Refresh()
 		
 
@@ -1930,22 +3944,26 @@ class ReMeasureButton(wx.Panel):
 		self.praatButton.SetValue(True)
 		self.formantButton = wx.RadioButton(self, label = 'FORMANTS')
 		self.durationButton = wx.RadioButton(self, label = r'% OF DURATION')
+		self.estimateButton = wx.RadioButton(self, label = 'ESTIMATE (LPC)')
 		## layout controls
 		sizer.Add(text)
 		sizer.Add(self.praatButton)
 		sizer.Add(self.formantButton)
 		sizer.Add(self.durationButton)
+		sizer.Add(self.estimateButton)
 		
 		self.SetSizer(sizer)
 		# bind button clicks
 		self.praatButton.Bind(wx.EVT_RADIOBUTTON, self._SetMode)
 		self.formantButton.Bind(wx.EVT_RADIOBUTTON, self._SetMode)
 		self.durationButton.Bind(wx.EVT_RADIOBUTTON, self._SetMode)
+		self.estimateButton.Bind(wx.EVT_RADIOBUTTON, self._SetMode)
 
 	def _SetMode(self, e):
 		## sets remeasurement mode
 		if self.praatButton.GetValue(): self.mode = 'P'
 		elif self.formantButton.GetValue(): self.mode = 'F'
+		elif self.estimateButton.GetValue(): self.mode = 'L'
 		else: self.mode = 'D'
 
 	def GetMode(self):
@@ -1976,23 +3994,19 @@ class CancelButton(wx.Panel):
 		## (only active when a remeasurement is taking place)
 		plotPanel = self.GetTopLevelParent().plotPanel
 		self.button.Disable()
-		rePlaceCheck = False
 		if not plotPanel.GetRemeasurePermissions():
 			for rb in plotPanel.remeasureOptions:
-				if rb is not plotPanel.vowelInFocus:
-					plotPanel.RemoveStoredVowelValues(rb, rb.f1, rb.f2, rb.word, rb.duration, rb.cmuType, rb.otherType, rb.position)
+				if rb != plotPanel.vowelInFocus:
+					plotPanel.RemoveStoredVowelValues(rb)
 					rb.Hide()
-				if rb.f1 in plotPanel.maxmins[:2] or rb.f2 in plotPanel.maxmins[2:]:
-					rePlaceCheck = True
 
 			plotPanel.remeasureOptions = []
 			
-			plotPanel.vowelInFocus.SetBitmap(plotPanel.vowelInFocus.circleBitmap)
+			plotPanel.vowelInFocus.SetBitmap()
 			plotPanel.vowelInFocus = None
 			plotPanel.SetRemeasurePermissions(True)
-			plotPanel.CalculateFormantMaxMins()
 			
-			if rePlaceCheck:
+			if plotPanel.CalculateFormantMaxMins():
 				plotPanel.PlaceVowels()
 			else:
 				plotPanel.Refresh()
@@ -2057,6 +4071,7 @@ class SaveButton(wx.Panel):
 		self.button.Bind(wx.EVT_BUTTON, self.OnClick)
 
 		self.columnIndexes = {} ## this is set when loading files (set from plotPanel)
+		self.lineIndexes = {} ## {info file : (ParseCacheKey, line offsets)} also set when loading files (see ParseInfoFile)
 
 	def OnClick(self, e):
 		## warns if about to overwrite old files and then saves 
@@ -2066,41 +4081,104 @@ class SaveButton(wx.Panel):
 		except:
 			return
 		if self.saveDir == self.infoDir:
-			if OverwriteWarningDialog(self).ShowModal() == wx.ID_OK:
-				self.SaveFiles()
-		else:
-			self.SaveFiles()
+			if OverwriteWarningDialog(self).ShowModal() != wx.ID_OK:
+				return
+		summary, failed = self.SaveFiles()
+		if failed:
+			ScrolledMessageDialog(self, 'Some files could not be saved (their changes have been kept):\n\n'+'\n'.join(summary)).ShowModal()
 
 	def SaveFiles(self):
-		## saves the data from plotPanel.changes to the new file 
-		## by reading the old input file and making changes to it			
+		## saves the data from plotPanel.changes to the new files (several files are saved at the same time)
+		## by copying the old input file and rewriting only the changed lines (see SaveInfoFile)
+		## returns a summary of each file's save and whether any of them failed
 		plotPanel = self.GetTopLevelParent().plotPanel
 		delimiter = self.GetTopLevelParent().fileDelim
-		## iterate over plotPanel.changes
-		for infoFile,ch in plotPanel.changes.items():
-			logFile = join(self.saveDir , basename(infoFile))
-			lines = []
-			with open(infoFile, 'r') as infoF: ## read old (input) file 
-				lines = [line for line in infoF]
-			for c in ch: ## make changes to the line read from the old file according to plotPanel.changes
-				lines[c[0]] = lines[c[0]].strip('\n').split(delimiter)
-				for i, columnIndex in enumerate(self.columnIndexes[infoFile]):
-					lines[c[0]][columnIndex] = c[i+1]
-				lines[c[0]] = str(delimiter).join(lines[c[0]]+c[5:])+'\n' 
-			with open(logFile, 'w') as logF: ## write new lines (with changes) to the new file
-				for l in lines:
-					logF.write(l)
-		plotPanel.changes = {}
+		tasks = []
+		results = []
+		for infoFile, ch in plotPanel.changes.items():
+			task = (infoFile, ch.values(), join(self.saveDir , basename(infoFile)), None, self.columnIndexes[infoFile], delimiter)
+			try:
+				tasks.append(task[:3] + (self.GetLineOffsets(infoFile),) + task[4:])
+			except (IOError, OSError) as error: ## the file can't be read so it fails like any other file that can't be saved
+				results.append((task, error))
+		results += zip(tasks, SaveInfoFiles(tasks))
+		summary = []
+		failed = False
+		for task, result in results:
+			infoFile, ch, logFile = task[:3]
+			if isinstance(result, Exception): ## the changes are kept so saving can be tried again
+				summary.append('FAILED\t'+logFile+'\t'+str(result))
+				failed = True
+				continue
+			summary.append('saved\t'+logFile+'\t'+str(len(ch))+' changes')
+			del plotPanel.changes[infoFile]
+			changeJournal.MarkDone(infoFile)
+			if os.path.abspath(logFile) == os.path.abspath(infoFile):
+				self.lineIndexes[infoFile] = (ParseCacheKey(infoFile), result)
+				plotPanel.MarkSavedLines(infoFile, [c[0] for c in ch])
+		changeJournal.Compact() ## the saved changes are no longer needed in the journal
+		return summary, failed
+
+	def GetLineOffsets(self, infoFile):
+		## returns the byte offset of each line in an info file (and of the end of the file)
+		## the offsets found when the file was loaded are used unless the file has changed since
+		key, offsets = self.lineIndexes.get(infoFile, (None, None))
+		if key != ParseCacheKey(infoFile):
+			offsets = LineOffsets(infoFile)
+			self.lineIndexes[infoFile] = (ParseCacheKey(infoFile), offsets)
+		return offsets
 
 	def CheckState(self):
 		## enables/disables the button if there is nothing to save
-		if self.GetTopLevelParent().past: 
+		if self.GetTopLevelParent().history.past or self.GetTopLevelParent().plotPanel.changes: 
 			self.button.Enable()
 			self.GetTopLevelParent().saveItem.Enable()
 		else: 
 			self.button.Disable()
 			self.GetTopLevelParent().saveItem.Enable(False)
 
+UNDO_MAX_COMMANDS = 1000 # number of actions that can be undone/redone
+UNDO_MAX_ROWS = 1000000 # number of vowels the undo/redo history can refer to (older actions are forgotten first)
+
+class UndoHistory():
+	## actions that can be undone (past) and redone (future) 
+	## each action is a command: (command type, old rows, new rows, remove info) where old rows are the vowels (row ids in 
+	## PlotPanel.store) that were on the plot before the action and new rows the ones that replaced them (None for no vowels)
+	## the commands in future have old and new rows swapped (they are executed the same way, see UndoRedoButtons.ExecuteCommand)
+	## remove info is (good, note) for removals (see RemoveFromPlotOptions.GetRemoveInfo)
+	## oldest commands are forgotten once there are more than maxCommands or they refer to more than maxRows vowels
+	def __init__(self, maxCommands = UNDO_MAX_COMMANDS, maxRows = UNDO_MAX_ROWS):
+		self.maxCommands = maxCommands
+		self.maxRows = maxRows
+		self.past = collections.deque()
+		self.future = collections.deque()
+		self.rows = 0 # number of vowels all the commands refer to 
+
+	def Size(self, command):
+		return sum(len(rows) for rows in command[1:3] if rows is not None)
+
+	def Do(self, command):
+		## records a new action (the actions that were undone can no longer be redone)
+		self.rows -= sum(self.Size(c) for c in self.future)
+		self.future.clear()
+		self.past.append(command)
+		self.rows += self.Size(command)
+		## (the newest command is always kept)
+		while len(self.past) > 1 and (len(self.past) > self.maxCommands or self.rows > self.maxRows):
+			self.rows -= self.Size(self.past.popleft())
+
+	def Undo(self):
+		## returns the command that puts the plot back the way it was before the last action
+		command = self.past.pop()
+		self.future.append((command[0], command[2], command[1], command[3]))
+		return command
+
+	def Redo(self):
+		## returns the command that redoes the last action that was undone
+		command = self.future.pop()
+		self.past.append((command[0], command[2], command[1], command[3]))
+		return command
+
 class UndoRedoButtons(wx.Panel):
 	## panel containing buttons to undo/redo actions on the plot 
 	def __init__(self, parent):
@@ -2134,13 +4212,13 @@ class UndoRedoButtons(wx.Panel):
 
 	def CheckState(self):
 		## enables/disables the buttons if there is something to un/redo or not
-		if self.topParent.past: 
+		if self.topParent.history.past: 
 			self.undoButton.Enable()
 			self.GetTopLevelParent().undoItem.Enable()
 		else: 
 			self.undoButton.Disable()
 			self.GetTopLevelParent().undoItem.Enable(False)
-		if self.topParent.future: 
+		if self.topParent.history.future: 
 			self.redoButton.Enable()
 			self.GetTopLevelParent().redoItem.Enable()
 		else: 
@@ -2150,40 +4228,30 @@ class UndoRedoButtons(wx.Panel):
 
 	def Undo(self, e):
 		## undoes last remeasurement
-		command = self.topParent.past.pop()
-		self.ExecuteCommand(*command)
-		self.topParent.future.append((command[0], command[2], command[1]))
+		self.ExecuteCommand(*self.topParent.history.Undo())
 		self.CheckState()
 
 	def Redo(self, e):
 		## redoes last undid remeasurement
-		command = self.topParent.future.pop()
-		self.ExecuteCommand(*command)
-		self.topParent.past.append((command[0], command[2], command[1]))
+		self.ExecuteCommand(*self.topParent.history.Redo())
 		self.CheckState()
 
-	def ExecuteCommand(self, commandType, oldState, newState):
-		## remeasures or adds back or removes a vowel according to the command
-		if commandType == 'remeasure': 
-			self.topParent.plotPanel.allVowels.remove(newState)
-			self.topParent.plotPanel.RemoveStoredVowelValues(newState, newState.f1, newState.f2, newState.word, newState.duration, newState.cmuType, newState.otherType, newState.position)
-			newState.Hide()
-			self.topParent.plotPanel.allVowels.add(oldState)
-			self.topParent.plotPanel.AddVowelValues(oldState, oldState.f1, oldState.f2, oldState.word, oldState.duration, oldState.cmuType, oldState.otherType)
-			oldState.Show()
-			newState.LogChange()
-		elif commandType == 'remove':
-			if newState:
-				for v in newState:
-					v.RemoveVowel()
-			elif oldState:
-				for v in oldState:
-					self.topParent.plotPanel.allVowels.add(v)
-					self.topParent.plotPanel.AddVowelValues(v, v.f1, v.f2, v.word, v.duration, v.cmuType, v.otherType)
-					v.Show()
-					v.LogChange()
-		else:
+	def ExecuteCommand(self, commandType, oldRows, newRows, removeInfo):
+		## remeasures or adds back or removes vowels according to the command (see UndoHistory)
+		## the vowels in newRows are taken off the plot and the ones in oldRows are put back (all at once)
+		plotPanel = self.topParent.plotPanel
+		if commandType not in ('remeasure', 'remove'):
 			print >> sys.stderr, 'bad undo/redo execution command,  shouldn\'t get here'
+			return
+		if newRows is not None:
+			if commandType == 'remove': ## (a remeasured vowel is logged when the vowel it replaces is put back)
+				plotPanel.LogRows(newRows, *removeInfo)
+			plotPanel.RemoveRows(newRows)
+			plotPanel.store.visible[newRows] = False
+		if oldRows is not None:
+			plotPanel.AddRows(oldRows)
+			plotPanel.store.visible[oldRows] = True
+			plotPanel.LogRows(oldRows)
 		## reset plot
 		self.topParent.plotPanel.CalculateFormantMaxMins()
 		self.topParent.plotPanel.PlaceVowels()
@@ -2976,9 +5044,9 @@ class mainFrame(wx.Frame):
 	## main window frame
 	def __init__(self):
 		wx.Frame.__init__(self, None, title = 'FVR (Formant Visualization and Remeasurement)')
-		## lists to hold previous states for undo/redo buttons
-		self.past = []
-		self.future = []
+		## previous states for undo/redo buttons
+		self.history = UndoHistory()
+		self.batchRemeasurer = None # remeasures the vowels on the plot in the background (see OnBatchRemeasure)
 		## read default alternate phonetic alphabet
 		self.ReadAlternateVowelsFromFile()
 		## define sizer and panels
@@ -2994,6 +5062,8 @@ class mainFrame(wx.Frame):
 		self.SetSizer(self.mainSizer)
 		## default Location of praat 
 		self.Praat = self.GetPraatLocation()
+		## offer to restore changes that weren't saved before FVR last closed
+		self.RecoverChanges()
 
 		## setup menu bar
 		menubar = wx.MenuBar()
@@ -3008,6 +5078,7 @@ class mainFrame(wx.Frame):
 		self.saveItem = fileMenu.Append(wx.ID_SAVE)
 		saveAsItem = fileMenu.Append(wx.ID_ANY, 'Change Save Directory')
 		findPraatItem = fileMenu.Append(wx.ID_ANY, 'Find Praat')
+		batchItem = fileMenu.Append(wx.ID_ANY, 'Remeasure Visible Vowels in Praat')
 		configInputItem = fileMenu.Append(wx.ID_ANY, 'Configure Info Reader')
 		configFave = fileMenu.Append(wx.ID_ANY, 'Configure FAVE output')
 		closeItem = fileMenu.Append(wx.ID_EXIT, text = "&Exit")
@@ -3033,6 +5104,7 @@ class mainFrame(wx.Frame):
 		self.Bind(wx.EVT_MENU, self.OnOpen, openItem)
 		self.Bind(wx.EVT_MENU, self.OnOpenRecent, openRecentItem)
 		self.Bind(wx.EVT_MENU, self.OnFindPraat, findPraatItem)
+		self.Bind(wx.EVT_MENU, self.OnBatchRemeasure, batchItem)
 		self.Bind(wx.EVT_MENU, self.toolBarPanel.saveButton.OnClick, self.saveItem)
 		self.Bind(wx.EVT_MENU, self.OnClose, closeItem)
 		self.Bind(wx.EVT_CLOSE, self.OnClose)
@@ -3090,6 +5162,19 @@ class mainFrame(wx.Frame):
 		## returns name of alternate phonetic alphabet
 		return self.otherLabel
 
+	def RecoverChanges(self):
+		## checks the change journal for changes that weren't saved (eg. if FVR crashed)
+		## recovered changes are applied when their files are opened (see PlotPanel.ReplayChanges)
+		pending = changeJournal.Pending()
+		if not pending: return
+		message = 'FVR closed without saving changes to the following files:\n'+'\n'.join(pending)+'\n\nRestore these changes when the files are opened?'
+		if wx.MessageDialog(self, message, style = wx.YES_NO).ShowModal() == wx.ID_YES:
+			self.plotPanel.recoveredChanges = pending
+		else:
+			for infoFile in pending:
+				changeJournal.MarkDone(infoFile)
+			changeJournal.Compact()
+
 	def GetPraatLocation(self):
 		with open('recent_files.txt') as rfiles:
 			for line in rfiles:
@@ -3150,7 +5235,8 @@ class mainFrame(wx.Frame):
 
 	def OnClose(self, e):
 		## asks to save progress before closing
-		if self.plotPanel.changes and self.GetTopLevelParent().past:
+		## (changes that aren't saved are dropped from the change journal, see ChangeJournal)
+		if self.plotPanel.changes:
 			caption = 'Save changes before closing?'
 			closeDialog = wx.MessageDialog(self,caption, style=wx.YES_NO|wx.CANCEL)
 			answer = closeDialog.ShowModal()
@@ -3158,6 +5244,10 @@ class mainFrame(wx.Frame):
 				self.toolBarPanel.saveButton.OnClick(None)
 			elif answer == wx.ID_CANCEL:
 				return
+			else:
+				for infoFile in self.plotPanel.changes:
+					changeJournal.MarkDone(infoFile)
+		changeJournal.Compact()
 		self.Destroy()
 
 	def OnSaveTo(self, e):
@@ -3166,6 +5256,15 @@ class mainFrame(wx.Frame):
 		if saveDialog.ShowModal() == wx.ID_OK:
 			self.saveDir = saveDialog.GetPath()
 
+	def OnBatchRemeasure(self, e):
+		## remeasures all vowels on the plot in praat in one pass (in the background, see BatchRemeasurer)
+		## the new values are shown as alternates when remeasuring using FORMANTS
+		if self.batchRemeasurer and not self.batchRemeasurer.finished: return ## already remeasuring
+		rows = self.plotPanel.GetVisibleRows()
+		if not len(rows): return
+		self.batchRemeasurer = BatchRemeasurer(self.plotPanel, rows, PraatScriptRunner(self.Praat or ''))
+		self.batchRemeasurer.Start()
+
 	def OnFindPraat(self, e):
 		## lets user change the path to Praat
 		praatDialog = wx.FileDialog(self, message = 'Find location of Praat', style = wx.FD_OPEN)
@@ -3246,6 +5345,7 @@ class mainFrame(wx.Frame):
 
 if __name__ == "__main__":
 	## Where it all begins
+	multiprocessing.freeze_support() ## needed for the info file parsing processes in frozen (py2app/py2exe) builds
 	app = wx.App(False)
 	app.SetCallFilterEvent(True)
 	frame = mainFrame()
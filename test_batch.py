@@ -0,0 +1,114 @@
+## tests for remeasuring vowels in batch (see MeasureBatchJobs and BatchRemeasurer)
+## praat isn't needed, the runner is a fake that writes the output PRAAT_BATCH_SCRIPT would
+## run with: python -m unittest test_batch
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+import FVR
+
+class FakeRunner():
+	## stands in for PraatScriptRunner: writes an output line for each job of the wav it is run on
+	## results = {(time, maxFormant) : (f1, f2) or None for --undefined--}
+	method = 'fake'
+
+	def __init__(self, results):
+		self.results = results
+		self.wavs = [] # wavs the runner was run on
+
+	def Run(self, script, args):
+		jobFile, wav, outputFile = args
+		self.wavs.append(wav)
+		with open(outputFile, 'w') as output:
+			for i, (jobWav, timePoint, maxFormant) in enumerate(FVR.ReadBatchJob(jobFile)):
+				if jobWav != wav: continue
+				formants = self.results[(timePoint, maxFormant)]
+				if formants is None:
+					output.write(str(i+1)+'\t--undefined--\t--undefined--\n')
+				else:
+					output.write(str(i+1)+'\t'+str(formants[0])+'\t'+str(formants[1])+'\n')
+
+class FailingRunner():
+	## stands in for PraatScriptRunner when praat can't be run
+	method = 'fake'
+
+	def Run(self, script, args):
+		raise subprocess.CalledProcessError(1, ['praat', '--run', script] + args, 'not praat')
+
+class FakePlotPanel():
+	## the parts of PlotPanel that BatchRemeasurer uses
+	def __init__(self, rowJobs):
+		self.rowJobs = rowJobs
+		self.batchAlternates = {}
+
+	def BatchJobs(self, rows):
+		return [(row, job) for row, job in self.rowJobs if row in rows]
+
+	def GetTopLevelParent(self):
+		return None
+
+class FakeProgress():
+	## stands in for ProgressWindow
+	def __init__(self, *args):
+		pass
+
+	def Update(self, value, message):
+		pass
+
+	def Destroy(self):
+		pass
+
+class BatchTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.wav = os.path.join(self.directory, 'speaker.wav')
+		with open(self.wav, 'wb') as wavFile:
+			wavFile.write('RIFF' + '\0'*100)
+		## keep the remeasurement cache out of the working directory
+		self.savedCache = FVR.remeasureCache
+		FVR.remeasureCache = FVR.RemeasureCache(os.path.join(self.directory, 'remeasure_cache.txt'))
+		self.rowJobs = [(0, (self.wav, 1.5, 4)), (0, (self.wav, 1.5, 6)), (1, (self.wav, 2.25, 5))]
+		self.results = {(1.5, 4) : (500, 1500), (1.5, 6) : None, (2.25, 5) : (650, 1200)}
+
+	def tearDown(self):
+		FVR.remeasureCache = self.savedCache
+		shutil.rmtree(self.directory)
+
+	def testUndefinedSkipped(self):
+		## an undefined measurement isn't an alternate and isn't cached
+		measured = FVR.MeasureBatchJobs(self.rowJobs, FakeRunner(self.results))
+		self.assertEqual(measured, {0 : [(4, (500, 1500))], 1 : [(5, (650, 1200))]})
+		self.assertEqual(FVR.remeasureCache.Get(self.wav, 1.5, 6, 'fake'), None)
+
+	def testCachedOnSecondCall(self):
+		## the second time the same jobs are read from the cache without running praat
+		first = FVR.MeasureBatchJobs(self.rowJobs, FakeRunner(self.results))
+		runner = FakeRunner(self.results)
+		second = FVR.MeasureBatchJobs([job for job in self.rowJobs if job[1][2] != 6], runner)
+		self.assertEqual(second, first)
+		self.assertEqual(runner.wavs, [])
+		## (also in a new session)
+		FVR.remeasureCache = FVR.RemeasureCache(FVR.remeasureCache.path)
+		self.assertEqual(FVR.MeasureBatchJobs(self.rowJobs[:1], runner), {0 : [(4, (500, 1500))]})
+		self.assertEqual(runner.wavs, [])
+
+	def testFailureFallsBackToInteractive(self):
+		## when praat can't be run no batch alternates are kept so remeasuring a vowel uses FORMANTS as before
+		self.assertRaises(subprocess.CalledProcessError, FVR.MeasureBatchJobs, self.rowJobs, FailingRunner())
+		finished = []
+		progressWindow, callAfter = FVR.ProgressWindow, FVR.wx.CallAfter
+		FVR.ProgressWindow = FakeProgress
+		FVR.wx.CallAfter = lambda function, *args: function(*args)
+		try:
+			remeasurer = FVR.BatchRemeasurer(FakePlotPanel(self.rowJobs), [0, 1], FailingRunner())
+			remeasurer.Finish = finished.append
+			remeasurer.Run()
+		finally:
+			FVR.ProgressWindow, FVR.wx.CallAfter = progressWindow, callAfter
+		self.assertEqual(finished, [None])
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,80 @@
+## tests for talking to praat with sendpraat (see PraatController)
+## praat and sendpraat are fakes (shell scripts) that record what they were asked to do
+## run with: python -m unittest test_praat
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+import FVR
+
+## sendpraat says praat isn't running until the fake praat has started (made the started file)
+## a command containing "Log 1" is recorded and then hangs so it times out after it has reached praat
+FAKE_SENDPRAAT = '''#!/bin/sh
+if [ ! -e "%(directory)s/started" ]; then
+	echo "sendpraat: Program praat not running."
+	exit 1
+fi
+echo "$*" >> "%(directory)s/sent"
+case "$*" in
+	*"Log 1"*) sleep 5;;
+esac
+'''
+
+FAKE_PRAAT = '''#!/bin/sh
+echo launched >> "%(directory)s/launched"
+touch "%(directory)s/started"
+'''
+
+@unittest.skipIf(os.name == 'nt', 'the fake praat and sendpraat are shell scripts')
+class PraatControllerTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.sendpraat = self.WriteScript('sendpraat', FAKE_SENDPRAAT)
+		self.praat = self.WriteScript('praat', FAKE_PRAAT)
+		self.open = FVR.OPEN
+		FVR.OPEN = None ## praat is started directly (see PraatController.Launch)
+		self.controller = FVR.PraatController(self.sendpraat, timeout = 1, retries = 20, retryDelay = 0.05)
+
+	def tearDown(self):
+		FVR.OPEN = self.open
+		shutil.rmtree(self.directory)
+
+	def WriteScript(self, name, script):
+		path = os.path.join(self.directory, name)
+		with open(path, 'w') as scriptFile:
+			scriptFile.write(script % {'directory' : self.directory})
+		os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+		return path
+
+	def Lines(self, name):
+		## returns the lines a fake wrote to one of its files
+		path = os.path.join(self.directory, name)
+		if not os.path.exists(path): return []
+		with open(path) as record:
+			return record.read().splitlines()
+
+	def testRetriesUntilPraatIsRunning(self):
+		## the first command is tried again once praat has been started (and praat is only started once)
+		self.controller.SendCommands([['praat', 'a'], ['praat', 'b']], self.praat)
+		self.assertEqual(self.Lines('sent'), ['praat a', 'praat b'])
+		self.assertEqual(self.Lines('launched'), ['launched'])
+
+	def testNotLaunchedWhenRunning(self):
+		open(os.path.join(self.directory, 'started'), 'w').close()
+		self.controller.SendCommands([['praat', 'a']], self.praat)
+		self.assertEqual(self.Lines('sent'), ['praat a'])
+		self.assertEqual(self.Lines('launched'), [])
+
+	def testDeliveredCommandNotSentAgain(self):
+		## a command that timed out may already have run in praat so it isn't sent again
+		open(os.path.join(self.directory, 'started'), 'w').close()
+		command = ['praat', 'editor: "LongSound speaker"', 'Log 1']
+		self.assertRaises(FVR.PraatTimeout, self.controller.SendCommands, [command, ['praat', 'after']], self.praat)
+		self.assertEqual(self.Lines('sent'), [' '.join(command)])
+		self.assertEqual(self.Lines('launched'), [])
+
+if __name__ == '__main__':
+	unittest.main()